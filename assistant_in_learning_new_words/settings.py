@@ -43,6 +43,11 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# Токен для /metrics/, Prometheus передаёт его в заголовке Authorization: Bearer <token>.
+# Без токена метрики отдаются только адресам из INTERNAL_IPS, но за обратным прокси все запросы
+# приходят с адреса прокси, поэтому там нужно задать METRICS_TOKEN или закрыть /metrics/ на прокси.
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -62,8 +67,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.metrics.RequestMetricsMiddleware',  # метрики для /metrics/, должен быть первым
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'common.db_router.ReplicaStickyMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -97,15 +104,49 @@ WSGI_APPLICATION = 'assistant_in_learning_new_words.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': env('DATABASES_NAME'),
-        'USER': env('DATABASES_USER'),
-        'PASSWORD': env('DATABASES_PASSWORD'),
-        'HOST': env('DATABASES_HOST'),
-        'PORT': env('DATABASES_PORT'),
+# DATABASES_URL=sqlite:///db.sqlite3 заменяет PostgreSQL из DATABASES_* любой базой, например для локального запуска
+if env('DATABASES_URL', default=''):
+    DATABASES = {'default': env.db_url('DATABASES_URL')}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('DATABASES_NAME'),
+            'USER': env('DATABASES_USER'),
+            'PASSWORD': env('DATABASES_PASSWORD'),
+            'HOST': env('DATABASES_HOST'),
+            'PORT': env('DATABASES_PORT'),
+        }
     }
+
+# Реплики только для чтения: DATABASES_REPLICA_HOSTS=replica1.local,replica2.local добавляет алиасы
+# replica0, replica1, ... с теми же настройками, что и default, а в тестах они зеркала default.
+# DATABASES_REPLICA_URLS=sqlite:///replica.sqlite3 добавляет реплики с произвольными настройками, в тестах
+# у них своя база, поэтому локально маршрутизацию можно проверить на двух файлах SQLite.
+# Читают с реплик только представления, обёрнутые common.db_router.read_from_replica; после записи
+# пользователь REPLICA_STICKY_SECONDS читает из default, чтобы видеть свои изменения, несмотря на отставание реплик.
+
+REPLICA_DATABASES = []
+for host in env.list('DATABASES_REPLICA_HOSTS', default=[]):
+    alias = f'replica{len(REPLICA_DATABASES)}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+for url in env.list('DATABASES_REPLICA_URLS', default=[]):
+    alias = f'replica{len(REPLICA_DATABASES)}'
+    DATABASES[alias] = env.db_url_config(url)
+    REPLICA_DATABASES.append(alias)
+
+REPLICA_APP_LABELS = {'words'}
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=5)
+DATABASE_ROUTERS = ['common.db_router.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# CACHE_URL, например: locmemcache://, filecache:///var/tmp/django_cache, pylibmc://127.0.0.1:11211
+# locmem хранит кэш внутри процесса, при нескольких воркерах используйте file или memcached.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
 }
 
 # Password validation
@@ -145,12 +186,20 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media/'
+# каталоги MEDIA_ROOT с файлами, адресованными хэшем содержимого: их можно кэшировать навсегда
+IMMUTABLE_MEDIA_DIRECTORIES = ['dictionaries_images/']
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Words
+
+# свёртка диакритики в PairWord.original_key (café и cafe - один ключ); после изменения
+# нужно пересчитать ключи: python manage.py rebuild_word_keys
+WORDS_FOLD_DIACRITICS = env.bool('WORDS_FOLD_DIACRITICS', default=False)
+
 # Users
 
 AUTH_USER_MODEL = 'users.CustomUser'
@@ -14,14 +14,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.shortcuts import render
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from common.metrics import metrics
+from common.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('__debug__/', include("debug_toolbar.urls")),
+    path('metrics/', metrics, name='metrics'),
 
     path('users/', include("users.urls", namespace="users")),
     path('', include("words.urls", namespace="words")),
 ]
+
+if settings.DEBUG:
+    urlpatterns += [re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', serve_media)]
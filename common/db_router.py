@@ -0,0 +1,83 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+STICKY_COOKIE = 'primary_reads'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# реплика, выбранная read_from_replica для текущего запроса, или None, если запрос читает из default
+read_replica = ContextVar('read_replica', default=None)
+primary_written = ContextVar('primary_written', default=False)
+
+
+def get_replicas() -> list[str]:
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение моделей REPLICA_APP_LABELS на реплику, выбранную для запроса в read_from_replica.
+
+    Реплика выбирается один раз на запрос, чтобы все его чтения видели одно состояние данных,
+    а не реплики с разным отставанием. Остальные запросы (в том числе чтение перед записью
+    в тех же представлениях) идут в default.
+    Запись всегда идёт в default и помечает запрос, чтобы ReplicaStickyMiddleware на время
+    REPLICA_STICKY_SECONDS вернул пользователя на основную базу (read-your-writes).
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = read_replica.get()
+        if replica and model._meta.app_label in settings.REPLICA_APP_LABELS:
+            return replica
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in settings.REPLICA_APP_LABELS:
+            primary_written.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики содержат те же данные, что и default
+        return True
+
+
+def read_from_replica(view):
+    """
+    Разрешает представлению читать со случайной реплики для безопасных методов.
+
+    Шаблон TemplateResponse рендерится здесь же, потому что ленивые QuerySet
+    выполняются при рендеринге, уже после выхода из представления.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = get_replicas()
+        if not replicas or request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+
+        token = read_replica.set(random.choice(replicas))
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        finally:
+            read_replica.reset(token)
+
+        return response
+
+    return wrapper
+
+
+class ReplicaStickyMiddleware(MiddlewareMixin):
+    """После запроса с записью ставит cookie, и следующие REPLICA_STICKY_SECONDS чтения идут в default."""
+
+    def process_request(self, request):
+        primary_written.set(False)
+
+    def process_response(self, request, response):
+        if get_replicas() and (request.method not in SAFE_METHODS or primary_written.get()):
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,178 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками по имени представления, хранится в памяти процесса."""
+
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, view: str, value: float):
+        with self.lock:
+            counts, total = self.values.get(view, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self.values[view] = (counts, total + value)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            values = {view: (list(counts), total) for view, (counts, total) in self.values.items()}
+
+        for view, (counts, total) in sorted(values.items()):
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bucket, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{label}",le="{bucket}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {total}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {cumulative}')
+
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'words_request_duration_seconds', 'Request latency by URL name.',
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    'words_db_queries', 'SQL queries per request by URL name.',
+    (1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_DURATION = Histogram(
+    'words_db_duration_seconds', 'Time spent in SQL per request by URL name.',
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+SESSION_SIZE = Histogram(
+    'words_session_size_bytes', 'Serialized size of modified sessions by URL name.',
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+HISTOGRAMS = (REQUEST_DURATION, DB_QUERIES, DB_DURATION, SESSION_SIZE)
+
+
+class QueryCounter:
+    """Количество и время SQL-запросов одного HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# счётчик текущего HTTP-запроса: sync_to_async копирует контекст в свой поток,
+# поэтому асинхронные запросы, выполняющие ORM в общем потоке, считают только свои запросы
+request_query_counter = ContextVar('request_query_counter', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """execute_wrapper, который добавляет запрос к счётчику из request_query_counter."""
+    query_counter = request_query_counter.get()
+    if query_counter is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        query_counter.count += 1
+        query_counter.duration += time.perf_counter() - start
+
+
+def install_query_counter(connection, **kwargs):
+    """Ставит count_queries на подключение один раз, а не на каждый запрос."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_query_counter)
+
+
+class RequestMetricsMiddleware:
+    """
+    Собирает по каждому имени URL задержку, количество и время SQL-запросов и размер изменённой сессии.
+
+    Должен стоять первым в MIDDLEWARE, чтобы учитывать работу остальных middleware
+    и видеть сессию уже после её сохранения. Поддерживает асинхронный режим, чтобы под ASGI
+    не переводить асинхронные представления в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        # новые подключения получают count_queries через connection_created,
+        # здесь он ставится на подключения, открытые до загрузки модуля
+        for connection in connections.all():
+            install_query_counter(connection)
+
+        query_counter = QueryCounter()
+        start = time.perf_counter()
+        token = request_query_counter.set(query_counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_query_counter.reset(token)
+
+        self.observe(request, query_counter, start)
+        return response
+
+    async def __acall__(self, request):
+        query_counter = QueryCounter()
+        start = time.perf_counter()
+        token = request_query_counter.set(query_counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_query_counter.reset(token)
+
+        self.observe(request, query_counter, start)
+        return response
+
+    @staticmethod
+    def observe(request, query_counter: QueryCounter, start: float):
+        view = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        REQUEST_DURATION.observe(view, time.perf_counter() - start)
+        DB_QUERIES.observe(view, query_counter.count)
+        DB_DURATION.observe(view, query_counter.duration)
+
+        session = getattr(request, 'session', None)
+        if session is not None and session.modified:
+            SESSION_SIZE.observe(view, len(session.serializer().dumps(session._session)))
+
+
+def is_metrics_allowed(request) -> bool:
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    return request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+
+
+def metrics(request):
+    """Отдаёт метрики в текстовом формате Prometheus по METRICS_TOKEN, а без него только адресам из INTERNAL_IPS."""
+    if not is_metrics_allowed(request):
+        raise Http404
+
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.views.static import serve
+
+
 class DataMixin:
     title = None
 
@@ -6,3 +10,16 @@ class DataMixin:
         context['title'] = self.title
 
         return context
+
+
+def serve_media(request, path):
+    """
+    Отдаёт MEDIA_ROOT при разработке (DEBUG).
+
+    Файлы из IMMUTABLE_MEDIA_DIRECTORIES адресованы хэшем содержимого и никогда не меняются,
+    поэтому кэшируются браузером на год; в production те же заголовки должен ставить веб-сервер.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith(tuple(settings.IMMUTABLE_MEDIA_DIRECTORIES)):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,134 @@
+// Постраничная загрузка слов словаря для карточек и списка на странице словаря.
+// Слова запрашиваются у words:dictionary_words по курсору, следующая страница
+// загружается, когда список докручен до конца или карточки дошли до последнего слова.
+document.addEventListener('DOMContentLoaded', function () {
+    const container = document.getElementById('dictionaryWords');
+    const wordsUrl = container.dataset.wordsUrl;
+    const totalWords = Number(container.dataset.totalWords);
+    const wordRows = document.getElementById('wordRows');
+    const sentinel = document.getElementById('wordsSentinel');
+
+    const card = document.getElementById('card');
+    const prevBtn = document.getElementById('prevBtn');
+    const nextBtn = document.getElementById('nextBtn');
+    const wordCountElement = document.getElementById('wordCount');
+    const originalElement = document.querySelector('.original h1');
+    const translationElement = document.querySelector('.translation h1');
+
+    const wordList = [];
+    let nextCursor = null;
+    let finished = false;
+    let loading = null;
+    let currentIndex = 0;
+    let isFlipped = false;
+    let sentinelVisible = false;
+
+    function appendRow(word) {
+        const row = document.createElement('li');
+        const pair = document.createElement('div');
+        pair.className = 'word-pair';
+
+        [[wordList.length, 'number'], [word.original, 'word'], [' | ', 'separator'], [word.translation, 'word']]
+            .forEach(function ([text, className]) {
+                const span = document.createElement('span');
+                span.className = className;
+                span.textContent = text;
+                pair.appendChild(span);
+            });
+
+        row.appendChild(pair);
+        wordRows.appendChild(row);
+    }
+
+    function loadNextPage() {
+        if (finished) {
+            return Promise.resolve();
+        }
+        if (loading) {
+            return loading;
+        }
+
+        const url = new URL(wordsUrl, window.location.origin);
+        if (nextCursor !== null) {
+            url.searchParams.set('cursor', nextCursor);
+        }
+
+        loading = fetch(url, {headers: {'Accept': 'application/json'}})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(`Loading words failed: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                data.words.forEach(function (word) {
+                    wordList.push(word);
+                    appendRow(word);
+                });
+                nextCursor = data.next_cursor;
+                finished = nextCursor === null;
+                loading = null;
+                showCard(currentIndex);
+
+                // список ещё не заполнил экран - подгружаем следующую страницу
+                if (sentinelVisible) {
+                    loadNextPage();
+                }
+            })
+            .catch(function (error) {
+                // страница загрузится заново при следующей прокрутке или нажатии "Next"
+                console.error(error);
+                loading = null;
+            });
+        return loading;
+    }
+
+    function showCard(index) {
+        const word = wordList[index];
+        originalElement.textContent = word ? word.original : '';
+        translationElement.textContent = word ? word.translation : '';
+        isFlipped = false;
+        card.classList.remove('is-flipped');
+
+        wordCountElement.textContent = `${word ? index + 1 : 0}/${totalWords}`;
+
+        // Проверка, можно ли нажать кнопку "Previous" и "Next"
+        prevBtn.classList.toggle('button-disabled', index === 0);
+        nextBtn.classList.toggle('button-disabled', finished && index >= wordList.length - 1);
+    }
+
+    prevBtn.addEventListener('click', function () {
+        if (currentIndex > 0) {
+            currentIndex--;
+            showCard(currentIndex);
+        }
+    });
+
+    nextBtn.addEventListener('click', function () {
+        const next = currentIndex + 1;
+        const loaded = next < wordList.length ? Promise.resolve() : loadNextPage();
+        loaded.then(function () {
+            if (next < wordList.length) {
+                currentIndex = next;
+                showCard(currentIndex);
+            }
+        });
+    });
+
+    card.addEventListener('click', function () {
+        if (!wordList.length) {
+            return;
+        }
+        isFlipped = !isFlipped;
+        card.classList.toggle('is-flipped');
+    });
+
+    new IntersectionObserver(function (entries) {
+        sentinelVisible = entries.some(entry => entry.isIntersecting);
+        if (sentinelVisible) {
+            loadNextPage();
+        }
+    }).observe(sentinel);
+
+    loadNextPage();
+});
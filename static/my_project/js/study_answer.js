@@ -0,0 +1,78 @@
+// Проверка ответов в режиме обучения без перезагрузки страницы.
+// Ответ отправляется в words:check_answer, результат и следующее слово приходят в JSON.
+// Если пачка слов закончилась или состояние обучения изменилось, страница перезагружается,
+// и следующую пачку формирует StudyWordsView.
+document.addEventListener('DOMContentLoaded', function () {
+    const form = document.getElementById('answerForm');
+    const answerUrl = form.dataset.answerUrl;
+    const answerInput = document.getElementById('id_user_answer');
+    const userContainer = form.querySelector('.user-container');
+    const title = document.getElementById('studyTitle');
+    const promptTranslation = document.getElementById('promptTranslation');
+
+    const answerResult = document.getElementById('answerResult');
+    const answerVerdict = document.getElementById('answerVerdict');
+    const answerOriginal = document.getElementById('answerOriginal');
+    const answerPoint = document.getElementById('answerPoint');
+    const continueBtn = document.getElementById('continueBtn');
+
+    let nextWord = null;
+    let sending = false;
+
+    const verdicts = {
+        exact: () => 'You are right!',
+        near: () => 'Almost right! Check the spelling:',
+        wrong: data => `Oops..wrong. Correct answer for "${data.translation}":`,
+    };
+
+    function showResult(data) {
+        answerVerdict.textContent = verdicts[data.match](data);
+        answerOriginal.value = data.original;
+        answerPoint.textContent = data.point;
+        userContainer.hidden = true;
+        answerResult.hidden = false;
+        continueBtn.focus();
+    }
+
+    function showNextWord() {
+        if (nextWord === null) {
+            window.location.reload();
+            return;
+        }
+
+        promptTranslation.textContent = nextWord.translation;
+        title.textContent = title.textContent.replace(/box: \d+$/, `box: ${nextWord.box}`);
+        answerInput.value = '';
+        answerResult.hidden = true;
+        userContainer.hidden = false;
+        answerInput.focus();
+    }
+
+    form.addEventListener('submit', function (event) {
+        event.preventDefault();
+        if (sending) {
+            return;
+        }
+        sending = true;
+
+        fetch(answerUrl, {method: 'POST', body: new FormData(form), headers: {'Accept': 'application/json'}})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(`Answer check failed: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                nextWord = data.next_word;
+                showResult(data);
+            })
+            .catch(function () {
+                window.location.reload();
+            })
+            .finally(function () {
+                sending = false;
+            });
+    });
+
+    continueBtn.addEventListener('click', showNextWord);
+});
@@ -1,16 +1,22 @@
 from django import forms
+from django.core.validators import FileExtensionValidator
 
 from .models import Dictionary, PairWord
+from .utils import clean_pair
+
+CUSTOM_SEPARATOR = 'Custom'
+SEPARATOR_CHOICES = ((' - ', 'Default: - '), ('\t', 'Tab'), (',', 'Comma'), (CUSTOM_SEPARATOR, 'Custom separator'))
 
 
 class AddDictionaryForm(forms.ModelForm):
     title = forms.CharField(max_length=150,
                             widget=forms.TextInput(attrs={'placeholder': 'Enter the name of the dictionary',
                                                           'style': 'width: 300px;'}))
+    image = forms.ImageField(required=False)
 
     class Meta:
         model = Dictionary
-        fields = ('title',)
+        fields = ('title', 'image')
 
 
 class AddPairWordForm(forms.ModelForm):
@@ -38,14 +44,23 @@ class ImportWordsForm(forms.ModelForm):
         self.fields['dictionary'].empty_label = 'No dictionary selected'
         self.fields['dictionary'].queryset = Dictionary.objects.filter(user=user)
 
-    text = forms.CharField(widget=forms.Textarea(attrs={'placeholder': 'Original 1 - Translation 1\n'
-                                                                       'Original 2 - Translation 2\n'
-                                                                       'Original 3 - Translation 3\n'
-                                                                       '...'
-                                                        }))
+    text = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'placeholder': 'Original 1 - Translation 1\n'
+                                                    'Original 2 - Translation 2\n'
+                                                    'Original 3 - Translation 3\n'
+                                                    '...'
+                                     }))
+
+    file = forms.FileField(
+        required=False,
+        validators=[FileExtensionValidator(allowed_extensions=['csv', 'tsv', 'txt'])],
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.tsv,.txt'}),
+        help_text='.csv and .tsv files are split by comma and tab, .txt files by the selected separator',
+    )
 
     sep_choice = forms.ChoiceField(
-        choices=((' - ', 'Default: - '), ('Custom', 'Custom separator')),
+        choices=SEPARATOR_CHOICES,
         initial=' - ',
         widget=forms.RadioSelect(),
     )
@@ -55,9 +70,75 @@ class ImportWordsForm(forms.ModelForm):
         widget=forms.TextInput(attrs={'placeholder': 'Enter custom separator'}),
     )
 
+    on_conflict = forms.ChoiceField(
+        choices=(('skip', 'Skip duplicates'), ('update', 'Update translation of duplicates')),
+        initial='skip',
+        widget=forms.RadioSelect(),
+    )
+
     class Meta:
         model = PairWord
-        fields = ('dictionary', 'text', 'sep_choice', 'custom_sep')
+        fields = ('dictionary', 'text', 'file', 'sep_choice', 'custom_sep', 'on_conflict')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('text') and not cleaned_data.get('file'):
+            raise forms.ValidationError('Paste the words or choose a file to import.')
+
+        return cleaned_data
+
+
+class ImportArchiveForm(forms.Form):
+    """Импорт zip-архива: каждый файл архива становится отдельным словарём."""
+    archive = forms.FileField(
+        validators=[FileExtensionValidator(allowed_extensions=['zip'])],
+        widget=forms.ClearableFileInput(attrs={'accept': '.zip'}),
+        help_text='one .txt, .csv or .tsv file per dictionary, the file name becomes the dictionary title',
+    )
+    sep_choice = forms.ChoiceField(
+        choices=SEPARATOR_CHOICES,
+        initial=' - ',
+        widget=forms.RadioSelect(),
+    )
+    custom_sep = forms.CharField(
+        max_length=10,
+        required=False,
+        widget=forms.TextInput(attrs={'placeholder': 'Enter custom separator'}),
+    )
+    on_conflict = forms.ChoiceField(
+        choices=(('skip', 'Skip duplicates'), ('update', 'Update translation of duplicates')),
+        initial='skip',
+        widget=forms.RadioSelect(),
+    )
+
+
+class ExportWordsForm(forms.Form):
+    """Параметры экспорта; все поля необязательные, пустые значения заменяются значениями по умолчанию."""
+    export_format = forms.ChoiceField(
+        choices=(('text', 'CSV / TSV / text'), ('jsonl', 'JSON Lines'), ('anki', 'Anki')),
+        required=False,
+        initial='text',
+    )
+    sep_choice = forms.ChoiceField(
+        choices=SEPARATOR_CHOICES,
+        required=False,
+        initial=' - ',
+    )
+    custom_sep = forms.CharField(
+        max_length=10,
+        required=False,
+        widget=forms.TextInput(attrs={'placeholder': 'Enter custom separator'}),
+    )
+    compress = forms.BooleanField(required=False, label='gzip')
+    background = forms.BooleanField(required=False, label='in background')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # без своего разделителя get_sep вернул бы само значение варианта 'Custom'
+        if cleaned_data.get('sep_choice') == CUSTOM_SEPARATOR and not cleaned_data.get('custom_sep'):
+            self.add_error('custom_sep', 'Enter a custom separator.')
+
+        return cleaned_data
 
 
 class RepeatWordForm(forms.Form):
@@ -75,16 +156,7 @@ class RepeatWordForm(forms.Form):
 
 
 class PairWordForm(forms.ModelForm):
-    original = forms.CharField(
-        widget=forms.TextInput(attrs={'class': 'word'}),
-        required=True
-    )
-
-    translation = forms.CharField(
-        widget=forms.TextInput(attrs={'class': 'word'}),
-        required=True
-    )
-
+    """Строка редактора словаря; original и translation с max_length модели приводятся к виду, как при импорте."""
     delete = forms.BooleanField(
         required=False,
         widget=forms.CheckboxInput(attrs={'class': 'delete-checkbox'})
@@ -93,3 +165,17 @@ class PairWordForm(forms.ModelForm):
     class Meta:
         model = PairWord
         fields = ['original', 'translation']
+        widgets = {
+            'original': forms.TextInput(attrs={'class': 'word'}),
+            'translation': forms.TextInput(attrs={'class': 'word'}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'original' in cleaned_data and 'translation' in cleaned_data:
+            pair = clean_pair(cleaned_data['original'], cleaned_data['translation'])
+            if pair is None:
+                raise forms.ValidationError('Original and translation are required.')
+            cleaned_data['original'], cleaned_data['translation'] = pair
+
+        return cleaned_data
@@ -0,0 +1,114 @@
+"""
+Обработчики фоновых задач words, их выполняет команда run_jobs.
+
+Обработчик получает JobService и payload задачи и возвращает результат, который показывает
+страница задачи: report - итог, url - куда перейти после завершения, file - файл для скачивания.
+"""
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from words.models import Dictionary, PairWord
+from words.services.dictionary_cache_service import DictionaryCacheService
+from words.services.dictionary_image_service import DictionaryImageService
+from words.services.export_words_service import ExportWordsService
+from words.services.import_archive_service import ImportArchiveService
+from words.services.import_words_service import ImportWordsService
+from words.services.job_service import JobService, register_job
+
+IMPORT_WORDS = 'import_words'
+IMPORT_ARCHIVE = 'import_archive'
+EXPORT_WORDS = 'export_words'
+DELETE_DICTIONARY = 'delete_dictionary'
+DICTIONARY_IMAGE = 'dictionary_image'
+
+JOB_FILES_DIRECTORY = 'jobs'
+DELETE_BATCH_SIZE = 1000
+
+
+def get_job_file_name(job_id: int, filename: str) -> str:
+    return f'{JOB_FILES_DIRECTORY}/{job_id}/{filename}'
+
+
+@register_job(IMPORT_WORDS)
+def import_words(job_service: JobService, dictionary_id: int, file: str, sep: str, on_conflict: str):
+    dictionary = Dictionary.objects.get(pk=dictionary_id)
+    total = default_storage.size(file)
+
+    with default_storage.open(file) as import_file:
+        # прогресс - прочитанные байты файла, поэтому он известен и без подсчёта строк заранее
+        import_service = ImportWordsService(
+            dictionary, sep, on_conflict, on_batch=lambda: job_service.set_progress(import_file.tell(), total)
+        )
+        import_service.import_file(import_file)
+    # после ошибки файл остаётся, чтобы задачу можно было повторить (run_jobs --retry-failed)
+    default_storage.delete(file)
+
+    if import_service.inserted or import_service.updated:
+        DictionaryCacheService(dictionary.id).invalidate()
+        dictionary.save()
+
+    return {'report': f'Import finished: {import_service}', 'url': dictionary.get_absolute_url()}
+
+
+@register_job(IMPORT_ARCHIVE)
+def import_archive(job_service: JobService, file: str, sep: str, on_conflict: str):
+    archive_service = ImportArchiveService(job_service.job.user, sep, on_conflict, on_file=job_service.set_progress)
+    with default_storage.open(file) as archive_file:
+        archive_service.import_archive(archive_file)
+    default_storage.delete(file)
+
+    return {'report': f'Import finished: {archive_service}', 'url': reverse('words:show_dictionaries')}
+
+
+@register_job(EXPORT_WORDS)
+def export_words(job_service: JobService, export_format: str, sep: str, compress: bool, dict_slug: str | None = None):
+    dictionaries = Dictionary.objects.filter(user=job_service.job.user).order_by('title', 'id')
+    if dict_slug:
+        dictionaries = dictionaries.filter(slug=dict_slug)
+
+    total = sum(dictionary.word_count for dictionary in dictionaries)
+    export_service = ExportWordsService(dictionaries, export_format, sep, compress)
+    filename = export_service.get_filename(dict_slug or 'dictionaries')
+
+    # файл собирается во временном файле и одним вызовом отдаётся хранилищу
+    with tempfile.TemporaryFile() as export_file:
+        for chunk in export_service:
+            export_file.write(chunk)
+            job_service.set_progress(export_service.exported, total)
+
+        name = default_storage.save(get_job_file_name(job_service.job.pk, filename), File(export_file))
+
+    return {'report': f'Exported {export_service.exported} words', 'file': name, 'filename': filename}
+
+
+@register_job(DELETE_DICTIONARY)
+def delete_dictionary(job_service: JobService, dictionary_id: int):
+    dictionary = Dictionary.objects.filter(pk=dictionary_id).first()
+    if dictionary is None:
+        return {'report': 'The dictionary has already been deleted', 'url': reverse('words:show_dictionaries')}
+
+    # слова удаляются пачками, чтобы каскад по WordProgress и WordStatistics не шёл одной огромной транзакцией
+    deleted = 0
+    while True:
+        word_ids = list(PairWord.objects.filter(dictionary_id=dictionary_id).values_list('id', flat=True)
+                        [:DELETE_BATCH_SIZE])
+        if not word_ids:
+            break
+
+        PairWord.objects.filter(id__in=word_ids).delete()
+        deleted += len(word_ids)
+        job_service.set_progress(deleted, dictionary.word_count)
+
+    DictionaryCacheService(dictionary_id).invalidate()
+    dictionary.delete()
+
+    return {'report': f'Dictionary "{dictionary.title}" deleted', 'url': reverse('words:show_dictionaries')}
+
+
+@register_job(DICTIONARY_IMAGE)
+def dictionary_image(job_service: JobService, image_hash: str, extension: str):
+    DictionaryImageService(image_hash, extension).generate_renditions()
+    return {}
@@ -0,0 +1,195 @@
+import itertools
+import json
+import time
+import tracemalloc
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from users.models import CustomUser
+from words.models import Dictionary, PairWord
+from words.services.custom_messages_service import CustomMessagesService
+from words.services.import_words_service import ImportWordsService
+from words.services.session_service import SessionService
+from words.services.study_words_service import StudyWordsService
+from words.utils import (Slug, get_answer_alternatives,
+                         get_delete_and_updated_words, match_answer)
+
+DEFAULT_SIZES = (10, 1000, 10000, 100000)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время, количество SQL-запросов и пиковую память сервисов обучения и утилит words '
+            'на словарях разного размера и сравнивает результат с сохранённым baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                            help='размеры словарей, на которых выполняются замеры')
+        parser.add_argument('--repeat', type=int, default=5, help='количество повторов для замера времени')
+        parser.add_argument('--baseline', default='benchmark_baseline.json', help='путь к файлу baseline')
+        parser.add_argument('--save', action='store_true', help='сохранить результаты как новый baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='допустимый рост времени и памяти относительно baseline (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options['baseline'])
+        if not options['save'] and not baseline_path.exists():
+            raise CommandError(f'Baseline {baseline_path} not found, create it with --save')
+
+        # замеры выполняются в отдельной тестовой базе, рабочие данные не затрагиваются
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run_benchmarks(options['sizes'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['save']:
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        regressions = self.report(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError(f'{regressions} performance regressions against {baseline_path}')
+
+    def run_benchmarks(self, sizes, repeat):
+        user = CustomUser.objects.create_user('benchmark', 'benchmark@example.com', 'benchmark', phone='benchmark')
+        results = {}
+
+        for size in sizes:
+            dictionary = Dictionary(title=f'Benchmark {size}', user=user)
+            dictionary.save()
+            PairWord.objects.bulk_create(
+                [PairWord(original=f'original {i}', translation=f'translation {i}', dictionary=dictionary)
+                 for i in range(size)],
+                batch_size=1000,
+            )
+            dictionary.update_word_count(size)
+
+            for name, benchmark in self.get_benchmarks(user, dictionary, size).items():
+                # замер, который пишет в базу, повторяется один раз, чтобы не мерить уже изменённые данные
+                runs = 1 if name == 'import_words_service' else repeat
+                results[f'{name}[{size}]'] = self.measure(benchmark, runs)
+                self.stdout.write(f'{name}[{size}]: {results[f"{name}[{size}]"]}')
+
+        return results
+
+    def get_benchmarks(self, user, dictionary, size):
+        import_counter = itertools.count()
+        titles = [f'Словарь номер {i} -- Dictionary #{i}!' for i in range(size)]
+        import_text = '\n'.join(f'import {i} - перевод {i}' for i in range(size))
+        existing_words = {
+            word_id: (original, translation)
+            for word_id, original, translation in
+            PairWord.objects.filter(dictionary=dictionary).values_list('id', 'original', 'translation')
+        }
+        changed_words = {
+            word_id: {'original': original, 'translation': f'{translation} changed' if word_id % 2 else translation,
+                      'delete': word_id % 10 == 0}
+            for word_id, (original, translation) in existing_words.items()
+        }
+
+        phrases = [' '.join(f'word{j}' for j in range(i % 10 + 1)) + f', synonym {i}' for i in range(size)]
+        answers = [get_answer_alternatives(phrase) for phrase in phrases]
+
+        def slug():
+            for title in titles:
+                Slug(title)
+
+        def unique_slugs():
+            Dictionary.objects.get_unique_slugs(user.id, titles)
+
+        def answer_matching():
+            for phrase, alternatives in zip(phrases, answers):
+                match_answer(phrase[::-1], alternatives)
+                match_answer(phrase[1:], alternatives)
+
+        def import_words_service():
+            target = Dictionary(title=f'Import {size} {next(import_counter)}', user=user)
+            target.save()
+            ImportWordsService(target, ' - ').import_text(import_text)
+
+        def delete_and_updated_words():
+            get_delete_and_updated_words(changed_words, existing_words, PairWord, dictionary)
+
+        def session_service():
+            SessionService(self.make_request(user), dictionary.slug).commit()
+
+        def study_words_service():
+            request = self.make_request(user)
+            StudyWordsService(request, SessionService(request, dictionary.slug))
+
+        def custom_messages_service():
+            request = self.make_request(user, {'user_answer': 'original 0'})
+            game_session = SessionService(request, dictionary.slug)
+            study_service = StudyWordsService(request, game_session)
+            CustomMessagesService(request, game_session.active_session.current_word_index,
+                                  study_service.study_words, study_service.scheduler, study_service.state)
+
+        return {
+            'slug': slug,
+            'unique_slugs': unique_slugs,
+            'answer_matching': answer_matching,
+            'import_words_service': import_words_service,
+            'get_delete_and_updated_words': delete_and_updated_words,
+            'session_service': session_service,
+            'study_words_service': study_words_service,
+            'custom_messages_service': custom_messages_service,
+        }
+
+    @staticmethod
+    def make_request(user, data=None):
+        factory = RequestFactory()
+        request = factory.post('/', data) if data else factory.get('/')
+        request.user = user
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        return request
+
+    @staticmethod
+    def measure(benchmark, repeat) -> dict:
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                benchmark()
+            elapsed = time.perf_counter() - start
+
+        # память замеряется отдельным прогоном: tracemalloc заметно замедляет код
+        tracemalloc.start()
+        benchmark()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'time_ms': round(elapsed / repeat * 1000, 3),
+            'queries': len(queries) // repeat,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def report(self, results, baseline, tolerance) -> int:
+        regressions = 0
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                self.stdout.write(self.style.WARNING(f'{name}: not in baseline'))
+                continue
+
+            problems = []
+            if result['queries'] > previous['queries']:
+                problems.append(f"queries {previous['queries']} -> {result['queries']}")
+            for metric in ('time_ms', 'peak_kb'):
+                if result[metric] > previous[metric] * (1 + tolerance):
+                    problems.append(f'{metric} {previous[metric]} -> {result[metric]}')
+
+            if problems:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f'{name}: ' + ', '.join(problems)))
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+        return regressions
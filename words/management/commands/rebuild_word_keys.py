@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+
+from words.models import PairWord
+from words.utils import make_word_key
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает PairWord.original_key, например после изменения WORDS_FOLD_DIACRITICS. '
+            'Слова, новый ключ которых совпал с другим словом того же словаря, остаются со старым ключом')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='количество слов в одной пачке')
+
+    def handle(self, *args, **options):
+        updated = conflicts = 0
+        last_id = 0
+
+        while True:
+            words = list(
+                PairWord.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'original', 'original_key', 'dictionary_id')[:options['batch_size']]
+            )
+            if not words:
+                break
+            last_id = words[-1].id
+
+            changed_words = []
+            for word in words:
+                key = make_word_key(word.original)
+                if key != word.original_key:
+                    word.original_key = key
+                    changed_words.append(word)
+
+            try:
+                with transaction.atomic():
+                    PairWord.objects.bulk_update(changed_words, ['original_key'])
+                updated += len(changed_words)
+            except IntegrityError:
+                # в пачке есть совпадения: сохраняем по одному слову, чтобы найти конфликтующие
+                for word in changed_words:
+                    try:
+                        with transaction.atomic():
+                            PairWord.objects.filter(pk=word.pk).update(original_key=word.original_key)
+                        updated += 1
+                    except IntegrityError:
+                        conflicts += 1
+                        self.stdout.write(self.style.WARNING(
+                            f'word {word.pk} "{word.original}" duplicates another word '
+                            f'of dictionary {word.dictionary_id}'
+                        ))
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {updated} word keys, {conflicts} conflicts'))
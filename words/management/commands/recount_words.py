@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from words.models import Dictionary, PairWord
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает Dictionary.word_count по фактическому количеству PairWord'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='id пользователя, словари которого нужно пересчитать')
+
+    def handle(self, *args, **options):
+        actual_count = Coalesce(Subquery(
+            PairWord.objects.filter(dictionary=OuterRef('pk'))
+            .order_by()
+            .values('dictionary')
+            .annotate(count=Count('id'))
+            .values('count')
+        ), 0)
+
+        dictionaries = Dictionary.objects.all()
+        if options['user']:
+            dictionaries = dictionaries.filter(user_id=options['user'])
+
+        broken = dictionaries.annotate(actual_count=actual_count).exclude(word_count=F('actual_count'))
+        repaired = Dictionary.objects.filter(pk__in=broken.values('pk')).update(word_count=actual_count)
+
+        self.stdout.write(self.style.SUCCESS(f'Repaired word_count of {repaired} dictionaries'))
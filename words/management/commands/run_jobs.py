@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+import words.jobs  # noqa: F401 регистрирует обработчики задач
+from words.models import Job
+from words.services.job_service import JobService
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди Job в пуле потоков, внешний брокер не нужен'
+    # как часто удаляются устаревшие файлы результатов задач
+    cleanup_interval = 60 * 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='количество задач, выполняемых одновременно')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='пауза в секундах между проверками пустой очереди')
+        parser.add_argument('--once', action='store_true', help='выполнить накопившиеся задачи и завершиться')
+        parser.add_argument('--requeue-running', action='store_true',
+                            help='вернуть в очередь задачи, оставшиеся в статусе running после остановки воркера; '
+                                 'использовать, только если другие воркеры не запущены')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='вернуть в очередь задачи, завершившиеся ошибкой')
+        parser.add_argument('--files-max-age', type=float, default=24,
+                            help='через сколько часов после завершения задачи удаляется её файл (экспорт)')
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            requeued = Job.objects.filter(status=Job.RUNNING).update(status=Job.PENDING, started_at=None)
+            self.stdout.write(f'Requeued {requeued} running jobs')
+        if options['retry_failed']:
+            requeued = Job.objects.filter(status=Job.FAILED).update(
+                status=Job.PENDING, error='', progress=0, total=None, started_at=None, finished_at=None
+            )
+            self.stdout.write(f'Requeued {requeued} failed jobs')
+
+        workers = options['workers']
+        files_max_age = timedelta(hours=options['files_max_age'])
+        running = set()
+        next_cleanup = 0.0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs') as executor:
+            while True:
+                if time.monotonic() >= next_cleanup:
+                    deleted = JobService.delete_expired_files(files_max_age)
+                    if deleted:
+                        self.stdout.write(f'Deleted {deleted} expired job files')
+                    next_cleanup = time.monotonic() + self.cleanup_interval
+
+                running = {future for future in running if not future.done()}
+
+                queue_empty = False
+                while len(running) < workers:
+                    claimed = JobService.claim_next()
+                    if claimed is None:
+                        queue_empty = True
+                        break
+                    self.stdout.write(f'Started {claimed.job}')
+                    running.add(executor.submit(self.run_job, claimed))
+
+                if queue_empty:
+                    if options['once'] and not running:
+                        break
+                    time.sleep(options['poll_interval'])
+                else:
+                    # все воркеры заняты, а в очереди могут быть задачи: ждём первый освободившийся
+                    wait(running, return_when=FIRST_COMPLETED)
+
+    def run_job(self, job_service: JobService):
+        # у каждого потока своё подключение к базе, его нужно закрыть после задачи
+        try:
+            job_service.run()
+            self.stdout.write(f'Finished {job_service.job}')
+        finally:
+            close_old_connections()
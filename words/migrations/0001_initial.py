@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=75, verbose_name='Название словаря')),
+                ('image', models.ImageField(null=True, upload_to='dictionaries_images', verbose_name='Картинка')),
+                ('slug', models.SlugField(max_length=80)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Словарь',
+                'verbose_name_plural': 'Словари',
+                'ordering': ['-created_at'],
+                'unique_together': {('user', 'slug')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PairWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.CharField(max_length=150)),
+                ('translation', models.CharField(max_length=150)),
+                ('dictionary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='words.dictionary')),
+            ],
+            options={
+                'unique_together': {('dictionary', 'original')},
+            },
+        ),
+        migrations.CreateModel(
+            name='UserLearningData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_active', models.BooleanField(default=False)),
+                ('level', models.IntegerField(default=1)),
+                ('start_index', models.IntegerField(default=0)),
+                ('end_index', models.IntegerField(default=5)),
+                ('step', models.IntegerField(default=5)),
+                ('stop_learning', models.IntegerField(default=3)),
+                ('point', models.IntegerField(default=0)),
+                ('next_level_point', models.IntegerField(default=5)),
+                ('current_word_index', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('dictionary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='words.dictionary')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('dictionary', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('words', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('progress', models.PositiveBigIntegerField(default=0)),
+                ('total', models.PositiveBigIntegerField(null=True)),
+                ('result', models.JSONField(default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='words_job_status_338a60_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WordProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('box', models.IntegerField(default=0)),
+                ('due_at', models.DateTimeField()),
+                ('dictionary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='words.dictionary')),
+                ('pair_word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='words.pairword')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'dictionary', 'due_at'], name='words_wordp_user_id_fedfac_idx')],
+                'unique_together': {('user', 'pair_word')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WordStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('right_answers', models.PositiveIntegerField(default=0)),
+                ('wrong_answers', models.PositiveIntegerField(default=0)),
+                ('pair_word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='words.pairword')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-wrong_answers'], name='words_words_user_id_7acb63_idx')],
+                'unique_together': {('user', 'pair_word')},
+            },
+        ),
+        migrations.AddField(
+            model_name='dictionary',
+            name='image_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Хэш картинки'),
+        ),
+        migrations.AddField(
+            model_name='dictionary',
+            name='image_ready',
+            field=models.BooleanField(default=False, verbose_name='Уменьшенные копии картинки готовы'),
+        ),
+        migrations.AddField(
+            model_name='dictionary',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество слов'),
+        ),
+        migrations.AddField(
+            model_name='pairword',
+            name='original_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='userlearningdata',
+            name='last_word_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userlearningdata',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
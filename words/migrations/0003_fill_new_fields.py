@@ -0,0 +1,62 @@
+from django.db import migrations
+from django.utils import timezone
+
+from words.utils import WORD_KEY_MAX_LENGTH, make_word_key
+
+
+def fill_new_fields(apps, schema_editor):
+    """
+    Заполняет поля, добавленные в 0002, для словарей, созданных до неё.
+
+    - PairWord.original_key: слова, которые различались только до нормализации (регистр, пробелы, NFKC),
+      получают ключ с суффиксом #id, иначе не создастся unique_together ('dictionary', 'original_key');
+    - Dictionary.word_count;
+    - UserLearningData.last_word_id вместо start_index: уже показанные слова получают WordProgress
+      и сразу встают к повторению, а новые слова выдаются после последнего показанного.
+    """
+    Dictionary = apps.get_model('words', 'Dictionary')
+    PairWord = apps.get_model('words', 'PairWord')
+    UserLearningData = apps.get_model('words', 'UserLearningData')
+    WordProgress = apps.get_model('words', 'WordProgress')
+    now = timezone.now()
+
+    for dictionary_id in Dictionary.objects.order_by('id').values_list('id', flat=True).iterator():
+        words = list(PairWord.objects.filter(dictionary_id=dictionary_id).order_by('id').only('id', 'original'))
+
+        keys = set()
+        for word in words:
+            key = make_word_key(word.original)
+            if key in keys:
+                suffix = f'#{word.id}'
+                key = key[:WORD_KEY_MAX_LENGTH - len(suffix)] + suffix
+            keys.add(key)
+            word.original_key = key
+        PairWord.objects.bulk_update(words, ['original_key'], batch_size=1000)
+        Dictionary.objects.filter(pk=dictionary_id).update(word_count=len(words))
+
+        for learning_data in UserLearningData.objects.filter(dictionary_id=dictionary_id):
+            # после полного прохода словаря (level > 1) показаны все слова
+            seen_words = words if learning_data.level > 1 else words[:learning_data.start_index]
+            if not seen_words:
+                continue
+
+            learning_data.last_word_id = seen_words[-1].id
+            learning_data.save(update_fields=['last_word_id'])
+            WordProgress.objects.bulk_create(
+                [WordProgress(user_id=learning_data.user_id, dictionary_id=dictionary_id, pair_word_id=word.id,
+                              due_at=now)
+                 for word in seen_words],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('words', '0002_new_tables_and_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_new_fields, migrations.RunPython.noop),
+    ]
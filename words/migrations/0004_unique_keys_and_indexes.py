@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('words', '0003_fill_new_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='pairword',
+            unique_together={('dictionary', 'original_key')},
+        ),
+        migrations.RemoveField(
+            model_name='userlearningdata',
+            name='end_index',
+        ),
+        migrations.RemoveField(
+            model_name='userlearningdata',
+            name='level',
+        ),
+        migrations.RemoveField(
+            model_name='userlearningdata',
+            name='start_index',
+        ),
+        migrations.RemoveField(
+            model_name='userlearningdata',
+            name='stop_learning',
+        ),
+        migrations.AddIndex(
+            model_name='dictionary',
+            index=models.Index(fields=['user', 'slug'], name='dictionary_slug_prefix_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dictionary',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='dictionary_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pairword',
+            index=models.Index(fields=['dictionary', 'original_key'], name='pairword_original_prefix_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='pairword',
+            index=models.Index(fields=['dictionary', 'translation'], name='pairword_transl_prefix_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='pairword',
+            index=models.Index(fields=['dictionary', 'id'], name='pairword_dictionary_id_idx'),
+        ),
+    ]
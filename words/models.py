@@ -1,24 +1,84 @@
 from datetime import datetime
-from random import shuffle
 
-from django.db import models
-from django.db.models import QuerySet
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.urls import reverse
 
 from users.models import CustomUser
-from words.utils import Slug
+from words.utils import (IMAGE_RENDITION_FORMATS, IMAGE_RENDITIONS,
+                         SLUG_MAX_LENGTH, SLUG_PREFIX_LENGTH,
+                         WORD_KEY_MAX_LENGTH, get_image_name, get_slug_base,
+                         make_unique_slugs, make_word_key)
+
+
+class DictionaryQuerySet(models.QuerySet):
+    """Уникальные в пределах пользователя слаги для новых и переименованных словарей."""
+    # сколько префиксов объединяется через OR в одном запросе занятых слагов
+    prefix_chunk_size = 100
+
+    def get_unique_slugs(self, user_id: int, titles: list[str], exclude_pk: int | None = None) -> list[str]:
+        # занятые слаги читаются по индексу (user, slug) одним запросом на prefix_chunk_size разных префиксов,
+        # чтобы большая пачка заголовков не превращалась в одно выражение из тысяч LIKE
+        bases = [get_slug_base(title) for title in titles]
+        prefixes = sorted({base[:SLUG_PREFIX_LENGTH] for base in bases})
+
+        taken = set()
+        for start in range(0, len(prefixes), self.prefix_chunk_size):
+            condition = Q()
+            for prefix in prefixes[start:start + self.prefix_chunk_size]:
+                condition |= Q(slug__startswith=prefix)
+
+            slugs = self.filter(condition, user_id=user_id).order_by()
+            if exclude_pk is not None:
+                slugs = slugs.exclude(pk=exclude_pk)
+            taken.update(slugs.values_list('slug', flat=True))
+
+        return make_unique_slugs(bases, taken)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        titles_by_user = {}
+        for obj in objs:
+            obj.created_at = obj.created_at or now
+            obj.updated_at = now
+            titles_by_user.setdefault(obj.user_id, []).append(obj)
+
+        for user_id, dictionaries in titles_by_user.items():
+            slugs = self.get_unique_slugs(user_id, [dictionary.title for dictionary in dictionaries])
+            for dictionary, slug in zip(dictionaries, slugs):
+                dictionary.slug = slug
+                dictionary._loaded_title = dictionary.title
+
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Dictionary(models.Model):
     title = models.CharField('Название словаря', max_length=75)
     image = models.ImageField('Картинка', upload_to='dictionaries_images', null=True)
-    slug = models.SlugField(max_length=80)
+    slug = models.SlugField(max_length=SLUG_MAX_LENGTH)
     created_at = models.DateTimeField()
     updated_at = models.DateTimeField()
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    word_count = models.PositiveIntegerField('Количество слов', default=0)
+    image_hash = models.CharField('Хэш картинки', max_length=64, blank=True, default='')
+    image_ready = models.BooleanField('Уменьшенные копии картинки готовы', default=False)
+
+    objects = DictionaryQuerySet.as_manager()
+
+    # заголовок, с которым словарь прочитан из базы: слаг пересчитывается, только если он изменился
+    _loaded_title = None
+    slug_attempts = 3
 
     class Meta:
         unique_together = ('user', 'slug')
+        indexes = [
+            models.Index(fields=['user', 'slug'], name='dictionary_slug_prefix_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+            # список словарей пользователя с keyset-пагинацией по (updated_at, id)
+            models.Index(fields=['user', '-updated_at', '-id'], name='dictionary_user_updated_idx'),
+        ]
         verbose_name = 'Словарь'
         verbose_name_plural = 'Словари'
         ordering = ['-created_at']
@@ -29,44 +89,137 @@ class Dictionary(models.Model):
     def get_absolute_url(self):
         return reverse('words:show_dictionary', kwargs={'dict_slug': self.slug})
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_title = instance.__dict__.get('title')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.created_at:
             self.created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        self.slug = Slug(self.title).slug
         self.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        super().save(*args, **kwargs)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # word_count меняется только через update_word_count, а image_ready - фоновой генерацией копий
+            # картинки, поэтому обычное сохранение их не трогает, чтобы не затереть устаревшим значением
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in ('word_count', 'image_ready')]
+
+        update_fields = kwargs.get('update_fields')
+        if self.title == self._loaded_title or (update_fields is not None and 'title' not in update_fields):
+            super().save(*args, **kwargs)
+            return
+
+        if update_fields is not None and 'slug' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'slug']
+
+        for attempt in range(1, self.slug_attempts + 1):
+            self.slug = Dictionary.objects.get_unique_slugs(self.user_id, [self.title], exclude_pk=self.pk)[0]
+            try:
+                # слаг мог занять параллельный запрос между проверкой и вставкой
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                break
+            except IntegrityError:
+                if attempt == self.slug_attempts:
+                    raise
+
+        self._loaded_title = self.title
+
+    @property
+    def image_urls(self) -> dict | None:
+        """URL уменьшенных копий картинки: {'thumb': {'webp': ..., 'jpg': ...}, 'large': {...}} или None."""
+        if not self.image_ready:
+            return None
+
+        return {
+            rendition: {extension: default_storage.url(get_image_name(self.image_hash, f'.{extension}', rendition))
+                        for extension in IMAGE_RENDITION_FORMATS}
+            for rendition in IMAGE_RENDITIONS
+        }
+
+    def update_word_count(self, delta: int):
+        if delta:
+            Dictionary.objects.filter(pk=self.pk).update(word_count=F('word_count') + delta)
+            self.word_count += delta
+
+
+class PairWordQuerySet(models.QuerySet):
+    """Заполняет original_key в массовых операциях, которые обходят PairWord.save()."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.original_key = make_word_key(obj.original)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'original' in fields and 'original_key' not in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.original_key = make_word_key(obj.original)
+            fields = [*fields, 'original_key']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if 'original' in kwargs and 'original_key' not in kwargs:
+            if not isinstance(kwargs['original'], str):
+                raise ValueError('original_key must be passed explicitly when original is an expression')
+            kwargs['original_key'] = make_word_key(kwargs['original'])
+        return super().update(**kwargs)
 
 
 class PairWord(models.Model):
     original = models.CharField(max_length=150)
     translation = models.CharField(max_length=150)
     dictionary = models.ForeignKey(Dictionary, on_delete=models.CASCADE)
+    # нормализованный original (make_word_key): по нему проверяются дубликаты и идёт поиск
+    original_key = models.CharField(max_length=WORD_KEY_MAX_LENGTH, editable=False)
+
+    objects = PairWordQuerySet.as_manager()
 
     class Meta:
-        unique_together = ('dictionary', 'original')
+        unique_together = ('dictionary', 'original_key')
+        # поиск по префиксу: на PostgreSQL LIKE 'abc%' использует индекс только с *_pattern_ops,
+        # другие базы opclasses игнорируют и строят обычный индекс
+        indexes = [
+            models.Index(fields=['dictionary', 'original_key'], name='pairword_original_prefix_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+            models.Index(fields=['dictionary', 'translation'], name='pairword_transl_prefix_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+            # слова словаря по id: страницы словаря, новые слова для обучения и кэш id
+            models.Index(fields=['dictionary', 'id'], name='pairword_dictionary_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.original} - {self.translation}"
 
+    def save(self, *args, **kwargs):
+        self.original_key = make_word_key(self.original)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'original' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'original_key'}
+
+        super().save(*args, **kwargs)
+
 
 class UserLearningData(models.Model):
     dictionary = models.ForeignKey(Dictionary, on_delete=models.CASCADE)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     session_active = models.BooleanField(default=False)
-    level = models.IntegerField(default=1)
-    start_index = models.IntegerField(default=0)
-    end_index = models.IntegerField(default=5)
     step = models.IntegerField(default=5)
-    stop_learning = models.IntegerField(default=3)
     point = models.IntegerField(default=0)
     next_level_point = models.IntegerField(default=5)
     current_word_index = models.IntegerField(default=0)
+    last_word_id = models.BigIntegerField(default=0)
+    version = models.IntegerField(default=0)
     created_at = models.DateTimeField()
 
     def __str__(self):
-        return f'{self.dictionary} | {self.user} | {self.session_active} | {self.level}'
+        return f'{self.dictionary} | {self.user} | {self.session_active}'
 
     class Meta:
         unique_together = ('dictionary', 'user')
@@ -89,11 +242,7 @@ class UserLearningData(models.Model):
         return (now - created).days
 
     def reset_session(self):
-        self.level = self._meta.get_field('level').get_default()
-        self.start_index = self._meta.get_field('start_index').get_default()
-        self.end_index = self._meta.get_field('end_index').get_default()
         self.step = self._meta.get_field('step').get_default()
-        self.stop_learning = self._meta.get_field('stop_learning').get_default()
         self.point = self._meta.get_field('point').get_default()
         self.next_level_point = self._meta.get_field('next_level_point').get_default()
         self.current_word_index = self._meta.get_field('current_word_index').get_default()
@@ -101,54 +250,79 @@ class UserLearningData(models.Model):
         self.session_active = self._meta.get_field('session_active').get_default()
         self.save()
 
-    def __check_and_reset_learning_data(self, db_words: list[dict]) -> None:
-        if self.start_index > len(db_words) - 1:
-            self.level += 1
-            self.start_index = 0
-            self.end_index = self.step
-            self.save()
-
-    def __filter_study_words(self, study_words: list[dict]) -> list[dict]:
-        return list(filter(lambda pair: pair['point'] < self.next_level_point, study_words))
 
-    def __generate_study_words(self, db_words: QuerySet) -> list[dict]:
-        study_words = [{'pair': [pair.original, pair.translation], 'point': self.point}
-                       for pair in db_words[self.start_index:self.end_index]]
+class WordProgress(models.Model):
+    """
+    Состояние интервального повторения (система Лейтнера) для пары слов конкретного пользователя.
 
-        shuffle(study_words)
+    box - номер коробки Лейтнера (0 - слово ещё не выучено), due_at - когда слово нужно повторить.
+    Индекс (user, dictionary, due_at) позволяет выбрать очередную пачку одним запросом
+    "due_at <= now ORDER BY due_at LIMIT n" независимо от размера словаря.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    dictionary = models.ForeignKey(Dictionary, on_delete=models.CASCADE)
+    pair_word = models.ForeignKey(PairWord, on_delete=models.CASCADE)
+    box = models.IntegerField(default=0)
+    due_at = models.DateTimeField()
 
-        return study_words
+    def __str__(self):
+        return f'{self.pair_word} | {self.user} | box: {self.box}'
 
-    def check_current_word_index(self, study_words):
-        if self.current_word_index + 1 > len(study_words):
-            self.current_word_index = 0
+    class Meta:
+        unique_together = ('user', 'pair_word')
+        indexes = [models.Index(fields=['user', 'dictionary', 'due_at'])]
 
-    def update_current_word_index(self):
-        self.current_word_index += 1
-        self.save()
 
-    def update_learning_data(self, study_words: list[dict]):
-        if self.level > self.stop_learning:
-            self.reset_session()
-            return
-        if study_words:
-            study_words = self.__filter_study_words(study_words)
+class WordStatistics(models.Model):
+    """
+    Счётчики верных и неверных ответов пользователя по паре слов за всё время.
 
-        else:
-            db_words = PairWord.objects.filter(dictionary=self.dictionary).order_by('id')
+    Индекс (user, -wrong_answers) позволяет выбрать самые частые ошибки одним запросом.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    pair_word = models.ForeignKey(PairWord, on_delete=models.CASCADE)
+    right_answers = models.PositiveIntegerField(default=0)
+    wrong_answers = models.PositiveIntegerField(default=0)
 
-            # проверяем start_index
-            self.__check_and_reset_learning_data(db_words)
+    def __str__(self):
+        return f'{self.pair_word} | {self.user} | +{self.right_answers} -{self.wrong_answers}'
 
-            # Генерируем новый список слов
-            study_words = self.__generate_study_words(db_words)
+    class Meta:
+        unique_together = ('user', 'pair_word')
+        indexes = [models.Index(fields=['user', '-wrong_answers'])]
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди в базе данных, её выполняет команда run_jobs.
+
+    Состояние и прогресс пишутся в ту же строку, их читает страница задачи.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
 
-            # обновляем star/end/current_index - index
-            self.current_word_index = 0
-            self.start_index = self.end_index
-            self.end_index = self.end_index + self.step
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveBigIntegerField(default=0)
+    total = models.PositiveBigIntegerField(null=True)
+    result = models.JSONField(default=dict)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
 
-        self.check_current_word_index(study_words)
-        self.save()
+    def __str__(self):
+        return f'{self.kind} #{self.pk} | {self.status}'
 
-        return study_words
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'])]
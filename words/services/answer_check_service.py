@@ -0,0 +1,83 @@
+from django.db.models import F
+
+from words.models import UserLearningData
+from words.services.session_service import LearningDataConflictError
+from words.services.spaced_repetition_service import SpacedRepetitionService
+from words.services.study_state_service import StudyStateService
+from words.services.word_statistics_service import WordStatisticsService
+from words.utils import MATCH_WRONG, match_answer
+
+
+class AnswerCheckService:
+    """
+    Асинхронная проверка ответа для JSON API обучения.
+
+    Работает с тем же состоянием, что и StudyWordsView (пачка из StudyStateService и UserLearningData),
+    но обходится без SessionService и StudyWordsService: на ответ выполняется одно условное UPDATE
+    UserLearningData по version, запись очков слова в кэш и прогресса и статистики слова через асинхронный ORM.
+    Когда пачка слов заканчивается, next_word равно None и следующую пачку формирует StudyWordsView.
+    """
+    def __init__(self, learning_data: UserLearningData, study_words: list[dict], state: StudyStateService):
+        self.learning_data = learning_data
+        self.study_words = study_words
+        self.state = state
+        self.scheduler = SpacedRepetitionService(learning_data)
+
+    async def check(self, user_answer: str) -> dict:
+        index = self.learning_data.current_word_index
+        if index >= len(self.study_words):
+            raise LearningDataConflictError('Current word index is out of study words')
+
+        study_word = self.study_words[index]
+        original, translation = study_word['pair']
+        match = match_answer(user_answer, study_word['answers'])
+        correct = match != MATCH_WRONG
+
+        study_word['point'] += 1 if correct else -1
+        graduated = study_word['point'] >= self.learning_data.next_level_point
+        if correct and graduated:
+            point_message = 'pair goes to the next level'
+        else:
+            point_message = f'point: {study_word["point"]}'
+
+        # выученное слово убирается из пачки, и на его место встаёт следующее
+        if graduated:
+            self.study_words.pop(index)
+        else:
+            index += 1
+        if index >= len(self.study_words):
+            index = 0
+
+        await self.update_current_word_index(index)
+        await self.scheduler.arecord_answer(study_word, correct)
+        await self.state.asave([study_word])
+        await WordStatisticsService(self.learning_data.user).arecord_answer(study_word['id'], correct)
+
+        return {
+            'correct': correct,
+            'match': match,
+            'original': original,
+            'translation': translation,
+            'user_answer': user_answer,
+            'point': point_message,
+            'box': study_word['box'],
+            'next_word': self.get_next_word(index),
+        }
+
+    async def update_current_word_index(self, index: int):
+        updated = await UserLearningData.objects.filter(
+            pk=self.learning_data.pk, version=self.learning_data.version
+        ).aupdate(current_word_index=index, version=F('version') + 1)
+
+        if not updated:
+            raise LearningDataConflictError('Learning data was changed by another request')
+
+        self.learning_data.current_word_index = index
+        self.learning_data.version += 1
+
+    def get_next_word(self, index: int) -> dict | None:
+        if not self.study_words:
+            return
+
+        study_word = self.study_words[index]
+        return {'translation': study_word['pair'][1], 'box': study_word['box']}
@@ -1,8 +1,17 @@
+from words.services.spaced_repetition_service import SpacedRepetitionService
+from words.services.study_state_service import StudyStateService
+from words.services.word_statistics_service import WordStatisticsService
+from words.utils import MATCH_NEAR, MATCH_WRONG, match_answer
+
+
 class CustomMessagesService:
-    def __init__(self, request, current_word_index, words):
+    def __init__(self, request, current_word_index, words, scheduler: SpacedRepetitionService,
+                 state: StudyStateService):
         self.request = request
         self.current_word_index = current_word_index
         self.words = words
+        self.scheduler = scheduler
+        self.state = state
         self.custom_messages = self.get_custom_messages()
 
     def __str__(self):
@@ -22,15 +31,17 @@ class CustomMessagesService:
         else:
             raise ValueError('Empty list words')
 
-        result = user_answer = point_message = None
+        result = user_answer = point_message = match = None
 
         if self.request.POST:
             user_answer = self.request.POST.get('user_answer', '').strip().lower()
+            study_word = self.words[self.current_word_index]
+            match = match_answer(user_answer, study_word['answers'])
 
-            if user_answer == original:
+            if match != MATCH_WRONG:
                 result = True
                 point += 1
-                if point > 4:
+                if point >= self.scheduler.learning_data.next_level_point:
                     point_message = 'pair goes to the next level'
                 else:
                     point_message = f'point: {point}'
@@ -40,22 +51,27 @@ class CustomMessagesService:
                 point_message = f'point: {point}'
 
             self.words[self.current_word_index]['point'] = point
+            self.scheduler.record_answer(self.words[self.current_word_index], result)
+            WordStatisticsService(self.request.user).record_answer(self.words[self.current_word_index]['id'], result)
+            self.state.save([study_word])
 
-        self.request.session['study_words'] = self.words
-        return result, original, translation, user_answer, point_message
+        return result, original, translation, user_answer, point_message, match
 
     def get_custom_messages(self):
-        result, original, translation, user_answer, point_message = self.check_user_answer()
+        result, original, translation, user_answer, point_message, match = self.check_user_answer()
         custom_messages = {}
 
         if not result:
             custom_messages['error_answer'] = True
+        if not result or match == MATCH_NEAR:
             custom_messages['user_answer'] = user_answer
 
         custom_messages.update({
             'translation': translation,
             'original': original,
             'point': point_message,
+            'match': match,
+            'box': self.words[self.current_word_index]['box'],
         })
 
         return custom_messages
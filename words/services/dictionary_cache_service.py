@@ -0,0 +1,71 @@
+import time
+
+from django.core.cache import cache
+
+from words.models import PairWord
+
+
+class DictionaryCacheService:
+    """
+    Версионированный кэш id слов словаря.
+
+    Все ключи словаря содержат его текущую версию, поэтому invalidate() не удаляет данные,
+    а только увеличивает версию: старые записи больше никто не читает, и они истекают сами.
+    Каждое место, которое добавляет, изменяет или удаляет PairWord, должно вызвать invalidate().
+    """
+    timeout = 60 * 60 * 24
+    id_chunk_size = 1000
+
+    def __init__(self, dictionary_id: int):
+        self.dictionary_id = dictionary_id
+        self.version = None
+
+    def get_version_key(self) -> str:
+        return f'dictionary:{self.dictionary_id}:version'
+
+    def get_version(self) -> int:
+        if self.version is None:
+            version_key = self.get_version_key()
+            self.version = cache.get(version_key)
+            if self.version is None:
+                cache.add(version_key, self.get_initial_version(), None)
+                self.version = cache.get(version_key)
+
+        return self.version
+
+    @staticmethod
+    def get_initial_version() -> int:
+        # версия от текущего времени больше любой прежней, даже если старый ключ версии был вытеснен
+        return time.time_ns()
+
+    def get_key(self, name: str) -> str:
+        return f'dictionary:{self.dictionary_id}:v{self.get_version()}:{name}'
+
+    def get_word_id(self, position: int) -> int | None:
+        """
+        Возвращает id слова, стоящего на позиции position при сортировке словаря по id.
+
+        id кэшируются блоками по id_chunk_size, поэтому поиск по позиции не требует
+        ни загрузки всего словаря, ни OFFSET-запроса на каждое обращение.
+        """
+        chunk_number, offset = divmod(position, self.id_chunk_size)
+        key = self.get_key(f'ids:{chunk_number}')
+        word_ids = cache.get(key)
+        if word_ids is None:
+            start = chunk_number * self.id_chunk_size
+            word_ids = list(
+                PairWord.objects.filter(dictionary_id=self.dictionary_id)
+                .order_by('id')
+                .values_list('id', flat=True)[start:start + self.id_chunk_size]
+            )
+            cache.set(key, word_ids, self.timeout)
+
+        return word_ids[offset] if offset < len(word_ids) else None
+
+    def invalidate(self):
+        self.version = None
+        version_key = self.get_version_key()
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, self.get_initial_version(), None)
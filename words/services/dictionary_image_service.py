@@ -0,0 +1,70 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from words.models import Dictionary
+from words.utils import (IMAGE_RENDITION_FORMATS, IMAGE_RENDITIONS,
+                         get_image_name)
+
+
+class DictionaryImageService:
+    """
+    Картинки словарей, адресованные хэшем содержимого.
+
+    Оригинал сохраняется один раз на хэш, уменьшенные копии IMAGE_RENDITIONS в WebP и JPEG
+    создаются с помощью Pillow фоновой задачей (words.jobs.DICTIONARY_IMAGE), поэтому загрузка
+    не ждёт обработки картинки. Пока копии не готовы (image_ready), шаблоны показывают картинку
+    по умолчанию; одинаковая картинка, загруженная повторно, готова сразу.
+    """
+    quality = 80
+
+    def __init__(self, image_hash: str, extension: str):
+        self.image_hash = image_hash
+        self.extension = extension
+
+    @classmethod
+    def save_upload(cls, dictionary: Dictionary, uploaded_file) -> 'DictionaryImageService':
+        """Сохраняет загруженный файл по хэшу содержимого и привязывает его к ещё не сохранённому словарю."""
+        sha256 = hashlib.sha256()
+        for chunk in uploaded_file.chunks():
+            sha256.update(chunk)
+
+        image_service = cls(sha256.hexdigest(), os.path.splitext(uploaded_file.name)[1].lower())
+        name = image_service.get_name()
+        if not default_storage.exists(name):
+            uploaded_file.seek(0)
+            name = default_storage.save(name, uploaded_file)
+
+        dictionary.image = name
+        dictionary.image_hash = image_service.image_hash
+        dictionary.image_ready = image_service.renditions_exist()
+        return image_service
+
+    def get_name(self, rendition: str | None = None, extension: str | None = None) -> str:
+        return get_image_name(self.image_hash, extension or self.extension, rendition)
+
+    def get_rendition_names(self) -> list[tuple[str, str, str]]:
+        return [(rendition, extension, self.get_name(rendition, f'.{extension}'))
+                for rendition in IMAGE_RENDITIONS for extension in IMAGE_RENDITION_FORMATS]
+
+    def renditions_exist(self) -> bool:
+        return all(default_storage.exists(name) for _, _, name in self.get_rendition_names())
+
+    def generate_renditions(self):
+        with default_storage.open(self.get_name()) as original_file:
+            original = ImageOps.exif_transpose(Image.open(original_file)).convert('RGB')
+
+        for rendition, extension, name in self.get_rendition_names():
+            if default_storage.exists(name):
+                continue
+
+            image = ImageOps.fit(original, IMAGE_RENDITIONS[rendition], Image.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, IMAGE_RENDITION_FORMATS[extension], quality=self.quality)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+
+        Dictionary.objects.filter(image_hash=self.image_hash).update(image_ready=True)
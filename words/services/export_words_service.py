@@ -0,0 +1,122 @@
+import csv
+import json
+import zlib
+from typing import Iterable, Iterator
+
+from words.models import Dictionary, PairWord
+
+
+class EchoBuffer:
+    """Псевдофайл для csv.writer: writerow возвращает готовую строку вместо записи в файл."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ExportWordsService:
+    """
+    Потоковый экспорт словарей.
+
+    Слова каждого словаря читаются итератором по индексу (dictionary, original_key) без сортировки
+    в базе, строки собираются в куски по buffer_size и при необходимости сразу сжимаются gzip,
+    поэтому память не зависит от размера экспорта, а первые байты уходят клиенту сразу.
+    Форматы text (с .csv/.tsv разделителями ',' и '\t') читаются обратно ImportWordsService.
+    """
+    chunk_size = 2000
+    buffer_size = 64 * 1024
+
+    TEXT = 'text'
+    JSON_LINES = 'jsonl'
+    ANKI = 'anki'
+
+    csv_separators = {',': ('.csv', 'text/csv'), '\t': ('.tsv', 'text/tab-separated-values')}
+    anki_header = '#separator:tab\n#html:false\n#deck column:3\n'
+
+    def __init__(self, dictionaries: Iterable[Dictionary], export_format: str = TEXT, sep: str = ' - ',
+                 compress: bool = False):
+        self.dictionaries = dictionaries
+        self.export_format = export_format
+        self.sep = sep
+        self.compress = compress
+        self.exported = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.stream()
+
+    def get_filename(self, name: str) -> str:
+        if self.export_format == self.JSON_LINES:
+            extension = '.jsonl'
+        elif self.export_format == self.TEXT and self.sep in self.csv_separators:
+            extension = self.csv_separators[self.sep][0]
+        else:
+            extension = '.txt'
+
+        return f'{name}{extension}.gz' if self.compress else f'{name}{extension}'
+
+    def get_content_type(self) -> str:
+        if self.compress:
+            return 'application/gzip'
+        if self.export_format == self.JSON_LINES:
+            return 'application/x-ndjson; charset=utf-8'
+        if self.export_format == self.TEXT and self.sep in self.csv_separators:
+            return f'{self.csv_separators[self.sep][1]}; charset=utf-8'
+        return 'text/plain; charset=utf-8'
+
+    def iter_words(self) -> Iterator[tuple[str, str, str]]:
+        for dictionary in self.dictionaries:
+            words = (
+                PairWord.objects.filter(dictionary=dictionary)
+                .order_by('original_key')
+                .values_list('original', 'translation')
+                .iterator(chunk_size=self.chunk_size)
+            )
+            for original, translation in words:
+                self.exported += 1
+                yield original, translation, dictionary.title
+
+    def iter_lines(self) -> Iterator[str]:
+        if self.export_format == self.JSON_LINES:
+            for original, translation, dictionary in self.iter_words():
+                yield json.dumps({'original': original, 'translation': translation, 'dictionary': dictionary},
+                                 ensure_ascii=False) + '\n'
+
+        elif self.export_format == self.ANKI:
+            yield self.anki_header
+            writer = csv.writer(EchoBuffer(), delimiter='\t', lineterminator='\n')
+            for row in self.iter_words():
+                yield writer.writerow(row)
+
+        elif self.sep in self.csv_separators:
+            writer = csv.writer(EchoBuffer(), delimiter=self.sep, lineterminator='\n')
+            for original, translation, _ in self.iter_words():
+                yield writer.writerow((original, translation))
+
+        else:
+            for original, translation, _ in self.iter_words():
+                yield f'{original}{self.sep}{translation}\n'
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        buffer = []
+        size = 0
+        for line in self.iter_lines():
+            buffer.append(line)
+            size += len(line)
+            if size >= self.buffer_size:
+                yield ''.join(buffer).encode()
+                buffer = []
+                size = 0
+
+        if buffer:
+            yield ''.join(buffer).encode()
+
+    def stream(self) -> Iterator[bytes]:
+        if not self.compress:
+            yield from self.iter_chunks()
+            return
+
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        for chunk in self.iter_chunks():
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable
+
+from django.db import transaction
+
+from users.models import CustomUser
+from words.models import Dictionary
+from words.services.import_words_service import ImportWordsService
+from words.utils import IMPORT_FILE_SEPARATORS, parse_import_file
+
+
+class ImportArchiveError(ValueError):
+    pass
+
+
+class ImportArchiveService:
+    """
+    Импорт zip-архива, в котором каждый файл .txt/.csv/.tsv - отдельный словарь.
+
+    Файлы разбираются параллельно в пуле процессов (parse_import_file), а по готовому результату
+    словарь с названием по имени файла создаётся и заполняется через ImportWordsService в одной
+    транзакции, поэтому запись в базу идёт одновременно с разбором остальных файлов, весь архив
+    импортируется примерно за время самого большого файла, а ошибка не оставляет пустых словарей.
+    """
+    max_files = 200
+    max_file_size = 20 * 1024 * 1024
+    max_archive_size = 200 * 1024 * 1024
+    max_workers = os.cpu_count() or 1
+
+    def __init__(self, user: CustomUser, sep: str, on_conflict: str = ImportWordsService.SKIP_DUPLICATES,
+                 on_file: Callable[[int, int], None] | None = None):
+        self.user = user
+        self.sep = sep
+        self.on_conflict = on_conflict
+        # вызывается после импорта каждого файла с количеством готовых и всех файлов
+        self.on_file = on_file
+        self.reports: list[tuple[Dictionary, ImportWordsService]] = []
+
+    def __str__(self):
+        return self.get_report()
+
+    def get_report(self):
+        inserted = sum(import_service.inserted for _, import_service in self.reports)
+        return f'dictionaries: {len(self.reports)}, words inserted: {inserted}'
+
+    def get_members(self, archive: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+        members = []
+        for member in archive.infolist():
+            name = os.path.basename(member.filename)
+            extension = os.path.splitext(name)[1].lower()
+            if member.is_dir() or name.startswith('.') or member.filename.startswith('__MACOSX/'):
+                continue
+            if extension not in IMPORT_FILE_SEPARATORS and extension != '.txt':
+                continue
+
+            if member.file_size > self.max_file_size:
+                raise ImportArchiveError(f'{member.filename} is larger than {self.max_file_size // 1024 // 1024} MB')
+            members.append(member)
+
+        if not members:
+            raise ImportArchiveError('The archive has no .txt, .csv or .tsv files')
+        if len(members) > self.max_files:
+            raise ImportArchiveError(f'The archive has more than {self.max_files} files')
+        if sum(member.file_size for member in members) > self.max_archive_size:
+            raise ImportArchiveError(f'The archive is larger than {self.max_archive_size // 1024 // 1024} MB')
+
+        return members
+
+    def import_archive(self, archive_file):
+        try:
+            archive = zipfile.ZipFile(archive_file)
+        except zipfile.BadZipFile:
+            raise ImportArchiveError('The file is not a zip archive') from None
+
+        with archive:
+            members = self.get_members(archive)
+
+            # spawn, а не fork: импорт выполняется в потоке воркера с открытыми подключениями к базе
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(members)),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = {
+                    executor.submit(parse_import_file, member.filename, archive.read(member), self.sep): member
+                    for member in members
+                }
+                for future in as_completed(futures):
+                    self.write_dictionary(self.get_title(futures[future]), future.result())
+                    if self.on_file:
+                        self.on_file(len(self.reports), len(members))
+
+    @staticmethod
+    def get_title(member: zipfile.ZipInfo) -> str:
+        max_length = Dictionary._meta.get_field('title').max_length
+        return os.path.splitext(os.path.basename(member.filename))[0][:max_length] or 'Dictionary'
+
+    def write_dictionary(self, title: str, pairs: list[tuple[str, str] | None]):
+        with transaction.atomic():
+            dictionary = Dictionary.objects.create(title=title, user=self.user)
+            import_service = ImportWordsService(dictionary, self.sep, self.on_conflict)
+            import_service.import_pairs(pairs)
+            if import_service.inserted or import_service.updated:
+                dictionary.save()
+
+        self.reports.append((dictionary, import_service))
@@ -0,0 +1,123 @@
+import io
+import os
+from typing import Callable, Iterable
+
+from django.db import connection, transaction
+
+from words.models import Dictionary, PairWord
+from words.utils import make_word_key, parse_import_lines
+
+
+class ImportWordsService:
+    """
+    Потоковый импорт пар слов в словарь.
+
+    Строки читаются по одной и записываются пачками по batch_size,
+    поэтому потребление памяти не зависит от размера импортируемого файла.
+    """
+    batch_size = 500
+
+    SKIP_DUPLICATES = 'skip'
+    UPDATE_TRANSLATION = 'update'
+
+    def __init__(self, dictionary: Dictionary, sep: str, on_conflict: str = SKIP_DUPLICATES,
+                 on_batch: Callable[[], None] | None = None):
+        self.dictionary = dictionary
+        self.sep = sep
+        self.on_conflict = on_conflict
+        # вызывается после записи каждой пачки, например для обновления прогресса фоновой задачи
+        self.on_batch = on_batch
+        self.max_length = PairWord._meta.get_field('original').max_length
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.malformed = 0
+
+    def __str__(self):
+        return self.get_report()
+
+    def get_report(self):
+        return (f'inserted: {self.inserted}, updated: {self.updated}, '
+                f'skipped: {self.skipped}, malformed: {self.malformed}')
+
+    def import_text(self, text: str):
+        self.import_pairs(parse_import_lines(io.StringIO(text), '.txt', self.sep))
+
+    def import_file(self, uploaded_file):
+        extension = os.path.splitext(uploaded_file.name)[1].lower()
+        uploaded_file.seek(0)
+        lines = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', errors='replace', newline='')
+
+        try:
+            self.import_pairs(parse_import_lines(lines, extension, self.sep))
+        finally:
+            # не даём обёртке закрыть загруженный файл вместе с собой
+            lines.detach()
+
+    def import_pairs(self, pairs: Iterable[tuple[str, str] | None]):
+        batch = {}
+        for pair in pairs:
+            if pair is None or max(len(pair[0]), len(pair[1])) > self.max_length:
+                self.malformed += 1
+                continue
+
+            key = make_word_key(pair[0])
+            if key in batch:
+                self.skipped += 1
+                continue
+
+            batch[key] = pair
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch)
+                batch = {}
+
+        if batch:
+            self.write_batch(batch)
+
+    def write_batch(self, batch: dict[str, tuple[str, str]]):
+        """
+        Записывает пачку одним INSERT ... ON CONFLICT, опираясь на unique_together ('dictionary', 'original_key').
+
+        Существующие слова словаря в Python не загружаются, поэтому стоимость импорта
+        зависит только от размера пачки. В режиме update вторым запросом обновляются
+        переводы уже существующих слов, если они отличаются.
+        """
+        params = []
+        for key, (original, translation) in batch.items():
+            params.extend((original, key, translation, self.dictionary.id))
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(self.get_insert_sql(len(batch), 'DO NOTHING'), params)
+            inserted = cursor.rowcount
+
+            updated = 0
+            if self.on_conflict == self.UPDATE_TRANSLATION and inserted < len(batch):
+                table = connection.ops.quote_name(PairWord._meta.db_table)
+                cursor.execute(self.get_insert_sql(
+                    len(batch),
+                    f'DO UPDATE SET translation = EXCLUDED.translation '
+                    f'WHERE {table}.translation <> EXCLUDED.translation'
+                ), params)
+                updated = cursor.rowcount
+
+            self.dictionary.update_word_count(inserted)
+
+        self.inserted += inserted
+        self.updated += updated
+        self.skipped += len(batch) - inserted - updated
+
+        if self.on_batch:
+            self.on_batch()
+
+    @staticmethod
+    def get_insert_sql(rows_count: int, conflict_action: str) -> str:
+        quote_name = connection.ops.quote_name
+        table = quote_name(PairWord._meta.db_table)
+        columns = ', '.join(quote_name(PairWord._meta.get_field(name).column)
+                            for name in ('original', 'original_key', 'translation', 'dictionary'))
+        conflict_columns = ', '.join(quote_name(PairWord._meta.get_field(name).column)
+                                     for name in ('dictionary', 'original_key'))
+        values = ', '.join(['(%s, %s, %s, %s)'] * rows_count)
+
+        return (f'INSERT INTO {table} ({columns}) VALUES {values} '
+                f'ON CONFLICT ({conflict_columns}) {conflict_action}')
@@ -0,0 +1,97 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Callable
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from users.models import CustomUser
+from words.models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS: dict[str, Callable] = {}
+
+
+def register_job(kind: str):
+    """Регистрирует обработчик задач вида kind: handler(job_service, **payload) -> dict с результатом."""
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return decorator
+
+
+class JobService:
+    """
+    Постановка задач в очередь, их захват воркером и выполнение.
+
+    Задача захватывается условным UPDATE ... WHERE status = 'pending', поэтому несколько
+    воркеров могут разбирать одну очередь без SELECT ... FOR UPDATE и внешнего брокера.
+    """
+    claim_candidates = 10
+    progress_interval = 0.5
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.progress_saved_at = 0.0
+
+    @staticmethod
+    def enqueue(user: CustomUser, kind: str, **payload) -> Job:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f'Unknown job kind: {kind}')
+        return Job.objects.create(user=user, kind=kind, payload=payload)
+
+    @classmethod
+    def claim_next(cls) -> 'JobService | None':
+        for job in Job.objects.filter(status=Job.PENDING).order_by('id')[:cls.claim_candidates]:
+            started_at = timezone.now()
+            if Job.objects.filter(pk=job.pk, status=Job.PENDING).update(status=Job.RUNNING, started_at=started_at):
+                job.status = Job.RUNNING
+                job.started_at = started_at
+                return cls(job)
+
+            # задачу успел захватить другой воркер
+
+    def set_progress(self, progress: int, total: int | None = None):
+        # прогресс пишется не чаще progress_interval, чтобы не превращать задачу в поток UPDATE
+        now = time.monotonic()
+        if now - self.progress_saved_at < self.progress_interval:
+            return
+
+        self.progress_saved_at = now
+        self.job.progress = progress
+        if total is not None:
+            self.job.total = total
+        Job.objects.filter(pk=self.job.pk).update(progress=self.job.progress, total=self.job.total)
+
+    def run(self):
+        handler = JOB_HANDLERS.get(self.job.kind)
+        try:
+            if handler is None:
+                raise ValueError(f'Unknown job kind: {self.job.kind}')
+            result = handler(self, **self.job.payload) or {}
+        except Exception as error:
+            logger.exception('Job %s failed', self.job.pk)
+            self.finish(status=Job.FAILED, error=str(error) or error.__class__.__name__)
+        else:
+            self.finish(status=Job.DONE, result=result, progress=self.job.total or self.job.progress)
+
+    @staticmethod
+    def delete_expired_files(max_age: timedelta) -> int:
+        """Удаляет файлы результатов (result['file']) задач, завершённых раньше max_age назад."""
+        jobs = Job.objects.filter(status=Job.DONE, result__has_key='file', finished_at__lt=timezone.now() - max_age)
+        deleted = 0
+        for job in jobs.only('id', 'result'):
+            default_storage.delete(job.result.pop('file'))
+            Job.objects.filter(pk=job.pk).update(result=job.result)
+            deleted += 1
+
+        return deleted
+
+    def finish(self, **values):
+        for field, value in values.items():
+            setattr(self.job, field, value)
+        self.job.finished_at = timezone.now()
+        Job.objects.filter(pk=self.job.pk).update(finished_at=self.job.finished_at, **values)
@@ -1,48 +1,89 @@
+from collections import Counter
 from datetime import datetime
 
+from django.db.models import F
+
 from words.models import Dictionary, UserLearningData
 
 
+class LearningDataConflictError(Exception):
+    """UserLearningData была изменена другим запросом (например, в соседней вкладке)."""
+
+
 class SessionService:
+    """
+    Загружает UserLearningData и записывает её изменения один раз в конце запроса.
+
+    Изменённые поля определяются сравнением со снимком, сделанным при загрузке, счётчики
+    обновляются через F()-выражения, а поле version защищает от перезаписи чужих изменений
+    без SELECT ... FOR UPDATE.
+    """
     def __init__(self, request, dict_slug):
         self.request = request
         self.active_session: UserLearningData = self.get_or_create_active_session(dict_slug)
-        self.reset_request_session()
+        self.initial_values = self.get_values()
+        self.increments = Counter()
+        self.activate_session()
         self.reset_data_active_session()
 
     def get_or_create_active_session(self, dict_slug: str):
         user = self.request.user
         dictionary = Dictionary.objects.filter(slug=dict_slug, user=user).first()
         active_session, _ = UserLearningData.objects.get_or_create(
-            dictionary=dictionary, user=user
+            dictionary=dictionary, user=user, defaults={'session_active': True}
         )
-        if not active_session.session_active:
-            active_session.session_active = True
-
-        active_session.save()
         return active_session
 
+    def activate_session(self):
+        if not self.active_session.session_active:
+            self.active_session.session_active = True
+
     def update_current_word_index(self, value: int = 1):
         self.active_session.current_word_index += value
-        self.active_session.save()
+        self.increments['current_word_index'] += value
+
+    def get_values(self) -> dict:
+        return {field.attname: getattr(self.active_session, field.attname)
+                for field in self.active_session._meta.concrete_fields if not field.primary_key}
 
-    def reset_request_session(self):
-        if self.active_session.dictionary.slug != self.request.session.get('dictionary_session'):
-            self.request.session['study_words'] = None
-            self.request.session['dictionary_session'] = '-'.join(self.active_session.dictionary.slug.split('_'))
+    def get_changed_values(self) -> dict:
+        changed_values = {}
+        for field, value in self.get_values().items():
+            initial_value = self.initial_values[field]
+            if value == initial_value:
+                continue
+
+            if field in self.increments and value == initial_value + self.increments[field]:
+                changed_values[field] = F(field) + self.increments[field]
+            else:
+                changed_values[field] = value
+
+        return changed_values
+
+    def commit(self):
+        changed_values = self.get_changed_values()
+        if not changed_values:
+            return
+
+        updated = UserLearningData.objects.filter(
+            pk=self.active_session.pk, version=self.active_session.version
+        ).update(version=F('version') + 1, **changed_values)
+
+        if not updated:
+            raise LearningDataConflictError('Learning data was changed by another request')
+
+        self.active_session.version += 1
+        self.initial_values = self.get_values()
+        self.increments.clear()
 
     def reset_data_active_session(self, **kwargs):
-        if self.check_days() or self.active_session.level > self.active_session.stop_learning:
+        if self.check_days():
             default_values = {
-                'level': self.active_session._meta.get_field('level').get_default(),
-                'start_index': self.active_session._meta.get_field('start_index').get_default(),
-                'end_index': self.active_session._meta.get_field('end_index').get_default(),
                 'step': self.active_session._meta.get_field('step').get_default(),
-                'stop_learning': self.active_session._meta.get_field('stop_learning').get_default(),
                 'point': self.active_session._meta.get_field('point').get_default(),
                 'next_level_point': self.active_session._meta.get_field('next_level_point').get_default(),
                 'current_word_index': self.active_session._meta.get_field('current_word_index').get_default(),
-                'created_at': None,
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'session_active': self.active_session._meta.get_field('session_active').get_default()
             }
 
@@ -51,8 +92,6 @@ class SessionService:
             for field, value in default_values.items():
                 setattr(self.active_session, field, value)
 
-            self.active_session.save()
-
     def check_days(self):
         now = datetime.now()
         created_at = self.active_session.created_at
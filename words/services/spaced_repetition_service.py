@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from words.models import PairWord, UserLearningData, WordProgress
+from words.utils import get_answer_alternatives
+
+
+class SpacedRepetitionService:
+    """
+    Планировщик повторений по системе Лейтнера.
+
+    Выученное слово переходит в следующую коробку и откладывается на её интервал,
+    ошибка возвращает слово в нулевую коробку, и оно сразу снова становится к повторению.
+    """
+    intervals = {
+        1: timedelta(days=1),
+        2: timedelta(days=3),
+        3: timedelta(days=7),
+        4: timedelta(days=14),
+        5: timedelta(days=30),
+    }
+
+    def __init__(self, learning_data: UserLearningData):
+        self.learning_data = learning_data
+        self.user = learning_data.user
+        self.dictionary = learning_data.dictionary
+
+    def get_due_words(self, limit: int) -> list[dict]:
+        due_words = (
+            WordProgress.objects
+            .filter(user=self.user, dictionary=self.dictionary, due_at__lte=timezone.now())
+            .order_by('due_at')
+            .values_list('pair_word_id', 'pair_word__original', 'pair_word__translation', 'box')[:limit]
+        )
+        return [self.make_study_word(word_id, original, translation, box)
+                for word_id, original, translation, box in due_words]
+
+    def get_new_words(self, limit: int) -> list[dict]:
+        """
+        Выбирает ещё не изучавшиеся слова keyset-пагинацией по id последнего выданного слова.
+
+        В отличие от среза со смещением, стоимость запроса не зависит от того, как далеко
+        пользователь продвинулся по словарю, а добавление и удаление слов не сдвигает пачку.
+        """
+        if limit <= 0:
+            return []
+
+        new_words = (
+            PairWord.objects
+            .filter(dictionary=self.dictionary, id__gt=self.learning_data.last_word_id)
+            .order_by('id')
+            .values_list('id', 'original', 'translation')[:limit]
+        )
+        study_words = [self.make_study_word(word_id, original, translation, 0)
+                       for word_id, original, translation in new_words]
+        if not study_words:
+            return study_words
+
+        self.learning_data.last_word_id = study_words[-1]['id']
+
+        now = timezone.now()
+        WordProgress.objects.bulk_create(
+            [WordProgress(user=self.user, dictionary=self.dictionary, pair_word_id=word['id'], due_at=now)
+             for word in study_words],
+            ignore_conflicts=True,
+        )
+        return study_words
+
+    def get_next_batch(self) -> list[dict]:
+        limit = self.learning_data.step
+        study_words = self.get_due_words(limit)
+        study_words.extend(self.get_new_words(limit - len(study_words)))
+        return study_words
+
+    def make_study_word(self, word_id: int, original: str, translation: str, box: int) -> dict:
+        # уже выученным словам для повторения достаточно одного верного ответа
+        point = self.learning_data.next_level_point - 1 if box else self.learning_data.point
+        return {'id': word_id, 'pair': [original, translation], 'point': point, 'box': box,
+                'answers': get_answer_alternatives(original)}
+
+    def schedule(self, box: int, correct: bool) -> tuple[int, timedelta]:
+        if not correct:
+            return 0, timedelta(0)
+
+        box = min(box + 1, max(self.intervals))
+        return box, self.intervals[box]
+
+    def get_answer_update(self, study_word: dict, correct: bool) -> dict | None:
+        graduated = study_word['point'] >= self.learning_data.next_level_point
+        if correct and not graduated:
+            return
+
+        box, interval = self.schedule(study_word['box'], correct)
+        study_word['box'] = box
+        return {'box': box, 'due_at': timezone.now() + interval}
+
+    def get_progress(self, study_word: dict):
+        return WordProgress.objects.filter(user=self.user, pair_word_id=study_word['id'])
+
+    def record_answer(self, study_word: dict, correct: bool):
+        values = self.get_answer_update(study_word, correct)
+        if values:
+            self.get_progress(study_word).update(**values)
+
+    async def arecord_answer(self, study_word: dict, correct: bool):
+        values = self.get_answer_update(study_word, correct)
+        if values:
+            await self.get_progress(study_word).aupdate(**values)
@@ -0,0 +1,119 @@
+from array import array
+from random import getrandbits
+
+from django.core.cache import cache
+
+
+class StudyStateService:
+    """
+    Пачка слов режима обучения в кэше вместо сессии.
+
+    Неизменяемая часть пачки (id, пары слов и нормализованные варианты ответа) записывается один раз
+    при её формировании, а очки и коробки слов хранятся отдельным упакованным массивом int16
+    и перезаписываются, только когда меняются, поэтому ответ обновляет несколько десятков байт в кэше,
+    а строка django_session не переписывается вовсе. Обе записи помечены токеном пачки: если одну из них
+    вытеснили из кэша, состояние считается потерянным, и StudyWordsService формирует новую пачку.
+
+    Слова возвращаются в формате SpacedRepetitionService.make_study_word с 'position' - номером слова
+    в сохранённой пачке.
+    """
+    timeout = 60 * 60 * 24 * 7
+
+    def __init__(self, user_id: int, dictionary_id: int):
+        self.user_id = user_id
+        self.dictionary_id = dictionary_id
+        self.token = None
+        self.progress = array('h')
+
+    def get_key(self, name: str) -> str:
+        return f'study:{self.user_id}:{self.dictionary_id}:{name}'
+
+    def get_keys(self) -> list[str]:
+        return [self.get_key('batch'), self.get_key('progress')]
+
+    def load(self, next_level_point: int) -> list[dict] | None:
+        return self.unpack(cache.get_many(self.get_keys()), next_level_point)
+
+    async def aload(self, next_level_point: int) -> list[dict] | None:
+        return self.unpack(await cache.aget_many(self.get_keys()), next_level_point)
+
+    def unpack(self, values: dict, next_level_point: int) -> list[dict] | None:
+        """Слова пачки, которые ещё не перешли на следующий уровень, или None, если пачки нет."""
+        batch = values.get(self.get_key('batch'))
+        progress = values.get(self.get_key('progress'))
+        if batch is None or progress is None or batch['token'] != progress[0]:
+            return None
+
+        self.token = batch['token']
+        self.progress = array('h', progress[1])
+        word_ids = array('q', batch['ids'])
+
+        study_words = []
+        for position, (word_id, pair, answers) in enumerate(zip(word_ids, batch['pairs'], batch['answers'])):
+            point, box = self.progress[2 * position], self.progress[2 * position + 1]
+            if point < next_level_point:
+                study_words.append({'id': word_id, 'pair': list(pair), 'point': point, 'box': box,
+                                    'answers': list(answers), 'position': position})
+
+        return study_words
+
+    def start(self, study_words: list[dict]):
+        """Сохраняет новую пачку целиком; study_words получают 'position'."""
+        self.token = getrandbits(32)
+        self.progress = array('h')
+        for position, study_word in enumerate(study_words):
+            study_word['position'] = position
+            self.progress.extend((study_word['point'], study_word['box']))
+
+        cache.set_many({
+            self.get_key('batch'): {
+                'token': self.token,
+                'ids': array('q', [study_word['id'] for study_word in study_words]).tobytes(),
+                'pairs': [tuple(study_word['pair']) for study_word in study_words],
+                'answers': [tuple(study_word['answers']) for study_word in study_words],
+            },
+            self.get_key('progress'): (self.token, self.progress.tobytes()),
+        }, self.timeout)
+
+    def update_progress(self, study_words: list[dict]) -> bool:
+        changed = False
+        for study_word in study_words:
+            position = 2 * study_word['position']
+            values = (study_word['point'], study_word['box'])
+            if tuple(self.progress[position:position + 2]) != values:
+                self.progress[position:position + 2] = array('h', values)
+                changed = True
+
+        return changed
+
+    def save(self, study_words: list[dict]):
+        """Записывает очки и коробки изменённых слов; пачка при этом не перезаписывается."""
+        if self.update_progress(study_words):
+            cache.set(self.get_key('progress'), (self.token, self.progress.tobytes()), self.timeout)
+
+    async def asave(self, study_words: list[dict]):
+        if self.update_progress(study_words):
+            await cache.aset(self.get_key('progress'), (self.token, self.progress.tobytes()), self.timeout)
+
+    def clear(self):
+        cache.delete_many(self.get_keys())
+
+    async def aclear(self):
+        await cache.adelete_many(self.get_keys())
+
+
+class RepeatStateService:
+    """Небольшое состояние повторения словаря (RepeatWordsView) в кэше, чтобы ответы не переписывали сессию."""
+    timeout = StudyStateService.timeout
+
+    def __init__(self, user_id: int, name: str):
+        self.key = f'repeat:{user_id}:{name}'
+
+    def get(self) -> dict | None:
+        return cache.get(self.key)
+
+    def set(self, repeat: dict):
+        cache.set(self.key, repeat, self.timeout)
+
+    def clear(self):
+        cache.delete(self.key)
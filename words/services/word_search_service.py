@@ -0,0 +1,95 @@
+from itertools import groupby
+
+from django.db import connections
+from django.db.models import Count, Q
+
+from users.models import CustomUser
+from words.models import PairWord
+from words.utils import get_prefix_upper_bound, make_word_key
+
+
+class WordSearchService:
+    """
+    Поиск слов по всем словарям пользователя.
+
+    Ищется префикс нормализованного оригинала (original_key) или перевода: такие условия обслуживаются
+    индексами pairword_*_prefix_idx по (dictionary, слово), поэтому запрос читает только подходящие
+    строки словарей пользователя, а не сканирует всю таблицу PairWord.
+    """
+    min_query_length = 2
+
+    def __init__(self, user: CustomUser):
+        self.user = user
+
+    @staticmethod
+    def clean_query(query: str) -> str:
+        # слова хранятся в нижнем регистре
+        return ' '.join(query.split()).lower()
+
+    def get_words(self):
+        return PairWord.objects.filter(dictionary__user=self.user)
+
+    def get_prefix_condition(self, field: str, prefix: str) -> Q:
+        """
+        Условие "field начинается с prefix".
+
+        SQLite не берёт LIKE 'abc%' из индекса, поэтому для него добавляется равносильный диапазон
+        field >= prefix AND field < upper, который читается из индекса (dictionary, field). В PostgreSQL
+        строки сравниваются по правилам локали, и там по индексу *_pattern_ops ищет сам LIKE.
+        """
+        condition = Q(**{f'{field}__startswith': prefix})
+        upper = get_prefix_upper_bound(prefix)
+        if upper is not None and connections[self.get_words().db].vendor == 'sqlite':
+            condition &= Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+        return condition
+
+    def search(self, query: str, limit: int) -> list[dict]:
+        query = self.clean_query(query)
+        if len(query) < self.min_query_length:
+            return []
+
+        condition = self.get_prefix_condition('original_key', make_word_key(query))
+        condition |= self.get_prefix_condition('translation', query)
+        return list(
+            self.get_words()
+            .filter(condition)
+            .order_by('original', 'id')
+            .values('id', 'original', 'translation', 'dictionary__title', 'dictionary__slug')[:limit]
+        )
+
+    def autocomplete(self, prefix: str, limit: int) -> list[dict]:
+        prefix = self.clean_query(prefix)
+        if len(prefix) < self.min_query_length:
+            return []
+
+        return list(
+            self.get_words()
+            .filter(self.get_prefix_condition('original_key', make_word_key(prefix)))
+            .order_by('original', 'id')
+            .values('original', 'translation', 'dictionary__title')[:limit]
+        )
+
+    def get_duplicates(self, limit: int) -> list[dict]:
+        """
+        Находит original_key, которые встречаются у пользователя больше одного раза.
+
+        Повторы ищутся одним GROUP BY по original_key, вторым запросом загружаются только слова
+        из найденных групп. Внутри одного словаря дубликатов нет: их не пускает unique_together.
+        """
+        duplicate_keys = list(
+            self.get_words()
+            .values('original_key')
+            .annotate(count=Count('id'))
+            .filter(count__gt=1)
+            .order_by('-count', 'original_key')
+            .values_list('original_key', flat=True)[:limit]
+        )
+        words = (
+            self.get_words()
+            .filter(original_key__in=duplicate_keys)
+            .order_by('original_key', 'dictionary__title')
+            .values('original_key', 'original', 'translation', 'dictionary__title', 'dictionary__slug')
+        )
+        groups = {key: list(group) for key, group in groupby(words, key=lambda word: word['original_key'])}
+
+        return [{'key': key, 'words': groups[key]} for key in duplicate_keys]
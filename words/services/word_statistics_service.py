@@ -0,0 +1,44 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from users.models import CustomUser
+from words.models import WordStatistics
+
+
+class WordStatisticsService:
+    def __init__(self, user: CustomUser):
+        self.user = user
+
+    def record_answer(self, pair_word_id: int, correct: bool):
+        field = 'right_answers' if correct else 'wrong_answers'
+        statistics = WordStatistics.objects.filter(user=self.user, pair_word_id=pair_word_id)
+
+        if statistics.update(**{field: F(field) + 1}):
+            return
+
+        try:
+            with transaction.atomic():
+                WordStatistics.objects.create(user=self.user, pair_word_id=pair_word_id, **{field: 1})
+        except IntegrityError:
+            # строку успел создать параллельный запрос
+            statistics.update(**{field: F(field) + 1})
+
+    async def arecord_answer(self, pair_word_id: int, correct: bool):
+        field = 'right_answers' if correct else 'wrong_answers'
+        statistics = WordStatistics.objects.filter(user=self.user, pair_word_id=pair_word_id)
+
+        if await statistics.aupdate(**{field: F(field) + 1}):
+            return
+
+        try:
+            await WordStatistics.objects.acreate(user=self.user, pair_word_id=pair_word_id, **{field: 1})
+        except IntegrityError:
+            await statistics.aupdate(**{field: F(field) + 1})
+
+    def get_most_missed(self, limit: int) -> list[tuple[int, str, str, int]]:
+        return list(
+            WordStatistics.objects
+            .filter(user=self.user, wrong_answers__gt=0)
+            .order_by('-wrong_answers')
+            .values_list('pair_word_id', 'pair_word__original', 'pair_word__translation', 'wrong_answers')[:limit]
+        )
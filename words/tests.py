@@ -1,3 +1,1544 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import re
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from random import Random
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q, QuerySet, Value
+from django.db.models.functions import Concat
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import SimpleTemplateResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from common.db_router import (STICKY_COOKIE, ReplicaRouter,
+                              ReplicaStickyMiddleware, read_from_replica,
+                              read_replica)
+from common.metrics import REQUEST_DURATION, RequestMetricsMiddleware
+from users.models import CustomUser
+from words import jobs
+from words.forms import ExportWordsForm
+from words.management.commands.benchmark_words import \
+    Command as BenchmarkWordsCommand
+from words.models import (Dictionary, DictionaryQuerySet, Job, PairWord,
+                          UserLearningData, WordProgress, WordStatistics)
+from words.services.export_words_service import ExportWordsService
+from words.services.import_archive_service import (ImportArchiveError,
+                                                   ImportArchiveService)
+from words.services.import_words_service import ImportWordsService
+from words.services.job_service import JobService
+from words.services.session_service import (LearningDataConflictError,
+                                            SessionService)
+from words.services.spaced_repetition_service import SpacedRepetitionService
+from words.services.study_state_service import StudyStateService
+from words.services.word_search_service import WordSearchService
+from words.services.word_statistics_service import WordStatisticsService
+from words.utils import (MATCH_EXACT, MATCH_NEAR, MATCH_WRONG,
+                         SLUG_MAX_LENGTH, SeededPermutation,
+                         bounded_edit_distance, get_answer_alternatives,
+                         make_unique_slugs, match_answer)
+
+
+def create_user(name: str) -> CustomUser:
+    return CustomUser.objects.create_user(name, f'{name}@example.com', 'password', phone=name)
+
+
+def use_temporary_media_root(test_case):
+    """Файлы default_storage, созданные тестом, пишутся во временный каталог и удаляются после теста."""
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    media_root = override_settings(MEDIA_ROOT=directory.name)
+    media_root.enable()
+    test_case.addCleanup(media_root.disable)
+
+
+class BaselineMigrationTest(TransactionTestCase):
+    """Обновление базы, созданной по моделям до появления миграций в репозитории (схема words 0001_initial)."""
+    migrate_from = [('words', '0001_initial')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        apps = self.migrate(self.migrate_from)
+        OldUser = apps.get_model('users', 'CustomUser')
+        OldDictionary = apps.get_model('words', 'Dictionary')
+        OldPairWord = apps.get_model('words', 'PairWord')
+        OldUserLearningData = apps.get_model('words', 'UserLearningData')
+
+        now = timezone.now()
+        user = OldUser.objects.create(username='old', email='old@example.com', phone='old')
+        self.dictionary = OldDictionary.objects.create(title='Old', slug='old', user=user, created_at=now,
+                                                       updated_at=now)
+        words = [OldPairWord(original=f'word {i}', translation=f'слово {i}', dictionary=self.dictionary)
+                 for i in range(10)]
+        # до нормализации это разные слова, после неё - один ключ
+        words.append(OldPairWord(original='straße', translation='улица', dictionary=self.dictionary))
+        words.append(OldPairWord(original='strasse', translation='улица', dictionary=self.dictionary))
+        self.words = OldPairWord.objects.bulk_create(words)
+        OldUserLearningData.objects.create(dictionary=self.dictionary, user=user, start_index=4, end_index=9,
+                                           created_at=now)
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_new_fields_are_filled(self):
+        self.assertEqual(Dictionary.objects.get(pk=self.dictionary.pk).word_count, 12)
+        self.assertEqual(PairWord.objects.get(original='word 1').original_key, 'word 1')
+        self.assertEqual(
+            sorted(PairWord.objects.filter(original__startswith='stra').values_list('original_key', flat=True)),
+            ['strasse', f'strasse#{self.words[-1].pk}'],
+        )
+
+        # четыре показанных слова встают к повторению, новые слова выдаются после них
+        learning_data = UserLearningData.objects.get(dictionary_id=self.dictionary.pk)
+        self.assertEqual(learning_data.last_word_id, self.words[3].pk)
+        self.assertEqual(
+            set(WordProgress.objects.values_list('pair_word_id', flat=True)), {word.pk for word in self.words[:4]}
+        )
+
+
+# планы проверяются на default, поэтому представления не должны читать с реплик из DATABASES_REPLICA_URLS
+@override_settings(REPLICA_DATABASES=[])
+class QueryPlanTest(TestCase):
+    """
+    EXPLAIN горячих запросов words: тест падает, если запрос читает таблицу целиком
+    (Seq Scan в PostgreSQL, SCAN в EXPLAIN QUERY PLAN SQLite).
+
+    В PostgreSQL последовательное чтение выключается (enable_seqscan = off), поэтому Seq Scan в плане
+    остаётся, только если у запроса нет подходящего индекса, и результат не зависит от объёма тестовых
+    данных. SQLite без ANALYZE и так считает индексы избирательными.
+    """
+    full_scan_patterns = {
+        'postgresql': re.compile(r'Seq Scan on (\w+)'),
+        'sqlite': re.compile(r'\bSCAN (\w+)'),
+    }
+    explain_prefixes = {'postgresql': 'EXPLAIN', 'sqlite': 'EXPLAIN QUERY PLAN'}
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [CustomUser.objects.create_user(f'plan{i}', f'plan{i}@example.com', 'password', phone=f'plan{i}')
+                 for i in range(3)]
+        dictionaries = Dictionary.objects.bulk_create([
+            Dictionary(title=f'Dictionary {i}', user=user, word_count=20) for user in users for i in range(3)
+        ])
+        words = PairWord.objects.bulk_create([
+            PairWord(original=f'word {i}', translation=f'перевод {i}', dictionary=dictionary)
+            for dictionary in dictionaries for i in range(20)
+        ])
+
+        now = timezone.now()
+        UserLearningData.objects.bulk_create([
+            UserLearningData(dictionary=dictionary, user_id=dictionary.user_id, created_at=now)
+            for dictionary in dictionaries
+        ])
+        WordProgress.objects.bulk_create([
+            WordProgress(user_id=word.dictionary.user_id, dictionary=word.dictionary, pair_word=word,
+                         box=i % 6, due_at=now + timedelta(days=i % 30))
+            for i, word in enumerate(words)
+        ])
+        WordStatistics.objects.bulk_create([
+            WordStatistics(user_id=word.dictionary.user_id, pair_word=word, right_answers=i % 7, wrong_answers=i % 5)
+            for i, word in enumerate(words)
+        ])
+        Job.objects.bulk_create([Job(user=user, kind='export_words', status=Job.DONE) for user in users])
+
+        cls.user = users[0]
+        cls.dictionary = dictionaries[0]
+
+    def setUp(self):
+        if connection.vendor not in self.full_scan_patterns:
+            self.skipTest(f'EXPLAIN checks are not supported for {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        self.client.force_login(self.user)
+
+    def assertPlanUsesIndexes(self, name: str, sql: str) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{self.explain_prefixes[connection.vendor]} {sql}')
+            plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+        tables = self.full_scan_patterns[connection.vendor].findall(plan)
+        self.assertFalse(tables, f'{name}: full scan of {", ".join(tables)}\n{sql}\n{plan}')
+        return plan
+
+    def assertQueriesUseIndexes(self, name: str, call, index: str | None = None):
+        """
+        Проверяет план каждого запроса, выполненного call().
+
+        С index один из запросов должен искать по этому индексу, а в SQLite ещё и по диапазону
+        второго поля индекса, а не только по его первому полю.
+        """
+        with CaptureQueriesContext(connection) as context:
+            call()
+
+        queries = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(queries, f'{name}: no queries')
+        plans = [self.assertPlanUsesIndexes(name, sql) for sql in queries]
+
+        if index is not None:
+            pattern = rf'{index} \(\w+=\? AND \w+>' if connection.vendor == 'sqlite' else index
+            self.assertTrue(any(re.search(pattern, plan) for plan in plans),
+                            f'{name}: {index} is not used\n' + '\n'.join(plans))
+
+    def assertQuerysetsUseIndexes(self, querysets: dict):
+        for name, queryset in querysets.items():
+            with self.subTest(name):
+                self.assertQueriesUseIndexes(name, lambda: list(queryset))
+
+    def test_dictionary_queries(self):
+        words = PairWord.objects.filter(dictionary=self.dictionary)
+        self.assertQuerysetsUseIndexes({
+            'dictionary words page': words.order_by('-id').values_list('id', 'original', 'translation')[:51],
+            'dictionary words after cursor': words.filter(id__lt=words.order_by('-id')[5].pk).order_by('-id')[:51],
+            'dictionary word ids chunk': words.order_by('id').values_list('id', flat=True)[10:20],
+            'dictionary by slug': Dictionary.objects.filter(user=self.user, slug=self.dictionary.slug),
+            'learning data by slug': (
+                UserLearningData.objects.select_related('dictionary')
+                .filter(user=self.user, dictionary__slug=self.dictionary.slug)
+            ),
+            'taken slugs': Dictionary.objects.filter(Q(slug__startswith='dictionary'), user_id=self.user.pk),
+            'words by key': words.filter(original_key='word 1'),
+        })
+
+    def test_dictionary_list(self):
+        first_page = self.client.get(reverse('words:show_dictionaries'))
+        dictionary = first_page.context['dictionary_list'][0]
+        cursor = f'{dictionary.updated_at.isoformat()}_{dictionary.pk}'
+
+        self.assertQueriesUseIndexes(
+            'dictionary list', lambda: self.client.get(reverse('words:show_dictionaries'))
+        )
+        self.assertQueriesUseIndexes(
+            'dictionary list after cursor', lambda: self.client.get(reverse('words:show_dictionaries'),
+                                                                    {'cursor': cursor})
+        )
+
+    def test_word_search(self):
+        for name, url, params, index in (
+            ('search', reverse('words:search_words'), {'q': 'word 1'}, 'pairword_original_prefix_idx'),
+            ('search by translation', reverse('words:search_words'), {'q': 'перевод 1'}, 'pairword_transl_prefix_idx'),
+            ('autocomplete', reverse('words:autocomplete_words'), {'q': 'wor'}, 'pairword_original_prefix_idx'),
+            ('duplicates', reverse('words:duplicate_words'), {}, None),
+        ):
+            with self.subTest(name):
+                self.assertQueriesUseIndexes(name, lambda: self.client.get(url, params), index)
+
+    def test_study_queries(self):
+        learning_data = UserLearningData.objects.select_related('user', 'dictionary').get(
+            user=self.user, dictionary=self.dictionary
+        )
+        scheduler = SpacedRepetitionService(learning_data)
+        self.assertQueriesUseIndexes('due words', lambda: scheduler.get_due_words(5))
+        self.assertQueriesUseIndexes('new study words', lambda: scheduler.get_new_words(5))
+        self.assertQuerysetsUseIndexes({
+            'most missed words': (
+                WordStatistics.objects.filter(user=self.user, wrong_answers__gt=0).order_by('-wrong_answers')[:50]
+            ),
+            'pending jobs': Job.objects.filter(status=Job.PENDING).order_by('id')[:10],
+        })
+
+
+class ImportWordsFileTest(TestCase):
+    """Потоковый импорт файла: строки разбираются по одной и пишутся пачками по batch_size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dictionary = Dictionary.objects.create(title='Import', user=create_user('import'))
+
+    def import_file(self, name: str, content: str, sep: str = ' - ', batch_size: int = 500):
+        """Импортирует файл и возвращает сервис импорта и количество записанных пачек."""
+        batches = []
+        import_service = ImportWordsService(self.dictionary, sep, on_batch=lambda: batches.append(True))
+        import_service.batch_size = batch_size
+        import_service.import_file(SimpleUploadedFile(name, content.encode('utf-8-sig')))
+        return import_service, len(batches)
+
+    def test_text_file_is_written_in_batches(self):
+        lines = [f'Word {i} - Слово {i}' for i in range(7)]
+        import_service, batches = self.import_file('words.txt', '\n'.join(lines + ['no separator', '']))
+
+        self.assertEqual((import_service.inserted, import_service.malformed, batches), (7, 1, 1))
+        self.assertEqual(PairWord.objects.get(original='word 3').translation, 'слово 3')
+
+        import_service, batches = self.import_file('more.txt', '\n'.join(f'new {i} - новое {i}' for i in range(7)),
+                                                   batch_size=3)
+        self.assertEqual((import_service.inserted, batches), (7, 3))
+
+        self.dictionary.refresh_from_db()
+        self.assertEqual(self.dictionary.word_count, 14)
+
+    def test_csv_and_tsv_files_use_their_separators(self):
+        self.import_file('words.csv', '"one, two",один\nthree,три\nbad row\n', sep=' - ')
+        self.import_file('words.tsv', 'four\tчетыре\n', sep=' - ')
+
+        self.assertEqual(
+            dict(PairWord.objects.filter(dictionary=self.dictionary).values_list('original', 'translation')),
+            {'one, two': 'один', 'three': 'три', 'four': 'четыре'},
+        )
+
+    def test_too_long_words_are_malformed(self):
+        import_service, _ = self.import_file('words.txt', f'{"a" * 151} - long\nshort - короткое')
+
+        self.assertEqual((import_service.inserted, import_service.malformed), (1, 1))
+
+
+class ImportWordsUpsertTest(TestCase):
+    """Дубликаты при импорте определяются в базе через INSERT ... ON CONFLICT по original_key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dictionary = Dictionary.objects.create(title='Upsert', user=create_user('upsert'))
+        PairWord.objects.create(original='cat', translation='кот', dictionary=cls.dictionary)
+        PairWord.objects.create(original='dog', translation='собака', dictionary=cls.dictionary)
+        cls.dictionary.update_word_count(2)
+
+    def import_pairs(self, pairs, on_conflict=ImportWordsService.SKIP_DUPLICATES) -> ImportWordsService:
+        import_service = ImportWordsService(self.dictionary, ' - ', on_conflict)
+        import_service.import_pairs(pairs)
+        return import_service
+
+    def get_words(self) -> dict:
+        return dict(PairWord.objects.filter(dictionary=self.dictionary).values_list('original', 'translation'))
+
+    def test_skip_duplicates(self):
+        with CaptureQueriesContext(connection) as context:
+            import_service = self.import_pairs([('cat', 'кошка'), ('bird', 'птица'), ('Bird ', 'птичка'), None])
+
+        self.assertEqual(
+            (import_service.inserted, import_service.updated, import_service.skipped, import_service.malformed),
+            (1, 0, 2, 1),
+        )
+        self.assertEqual(self.get_words(), {'cat': 'кот', 'dog': 'собака', 'bird': 'птица'})
+        # существующие слова словаря не загружаются в Python
+        self.assertFalse([query for query in context.captured_queries if query['sql'].startswith('SELECT')])
+
+        self.dictionary.refresh_from_db()
+        self.assertEqual(self.dictionary.word_count, 3)
+
+    def test_update_translation(self):
+        import_service = self.import_pairs([('cat', 'кошка'), ('dog', 'собака'), ('fox', 'лиса')],
+                                           ImportWordsService.UPDATE_TRANSLATION)
+
+        self.assertEqual((import_service.inserted, import_service.updated, import_service.skipped), (1, 1, 1))
+        self.assertEqual(self.get_words(), {'cat': 'кошка', 'dog': 'собака', 'fox': 'лиса'})
+
+        self.dictionary.refresh_from_db()
+        self.assertEqual(self.dictionary.word_count, 3)
+
+    def test_same_word_in_other_dictionary_is_not_a_duplicate(self):
+        other = Dictionary.objects.create(title='Other', user=self.dictionary.user)
+        import_service = ImportWordsService(other, ' - ')
+        import_service.import_pairs([('cat', 'кот')])
+
+        self.assertEqual(import_service.inserted, 1)
+
+
+class SessionServiceTest(TestCase):
+    """UserLearningData записывается одним условным UPDATE по version с F()-выражениями для счётчиков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('session')
+        cls.dictionary = Dictionary.objects.create(title='Session', user=cls.user)
+
+    def get_service(self) -> SessionService:
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return SessionService(request, self.dictionary.slug)
+
+    def get_learning_data(self) -> UserLearningData:
+        return UserLearningData.objects.get(user=self.user, dictionary=self.dictionary)
+
+    def test_commit_without_changes_does_not_write(self):
+        session_service = self.get_service()
+
+        with self.assertNumQueries(0):
+            session_service.commit()
+
+    def test_commit_increments_with_f_expression(self):
+        session_service = self.get_service()
+        session_service.update_current_word_index()
+        # значение изменено в базе без смены version, например миграцией данных
+        UserLearningData.objects.filter(pk=session_service.active_session.pk).update(current_word_index=10)
+
+        with self.assertNumQueries(1):
+            session_service.commit()
+
+        learning_data = self.get_learning_data()
+        self.assertEqual((learning_data.current_word_index, learning_data.version), (11, 1))
+        self.assertEqual(session_service.active_session.version, 1)
+
+    def test_concurrent_commit_raises_conflict(self):
+        first, second = self.get_service(), self.get_service()
+        first.active_session.step = 7
+        first.commit()
+
+        second.update_current_word_index()
+        with self.assertRaises(LearningDataConflictError):
+            second.commit()
+
+        learning_data = self.get_learning_data()
+        self.assertEqual((learning_data.step, learning_data.current_word_index), (7, 0))
+
+
+class UpdateDictionaryViewTest(TestCase):
+    """Редактор словаря получает только изменённые и удаляемые строки и применяет их в одной транзакции."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('editor')
+        cls.dictionary = Dictionary.objects.create(title='Editor', user=cls.user)
+        cls.words = PairWord.objects.bulk_create([
+            PairWord(original=f'word {i}', translation=f'слово {i}', dictionary=cls.dictionary) for i in range(5)
+        ])
+        cls.dictionary.update_word_count(5)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, data: dict):
+        return self.client.post(reverse('words:update_dictionary', kwargs={'dict_slug': self.dictionary.slug}),
+                                {'title': '', **data}, follow=True)
+
+    def get_words(self) -> dict:
+        return dict(PairWord.objects.filter(dictionary=self.dictionary).values_list('original', 'translation'))
+
+    def test_changed_and_deleted_rows_are_saved(self):
+        first, second = self.words[:2]
+        self.post({
+            f'word-{first.pk}-original': '  Renamed ', f'word-{first.pk}-translation': 'Новое',
+            f'word-{second.pk}-original': second.original, f'word-{second.pk}-translation': second.translation,
+            f'word-{second.pk}-delete': 'on',
+        })
+
+        words = self.get_words()
+        self.assertEqual(len(words), 4)
+        self.assertEqual(words['renamed'], 'новое')
+        self.assertNotIn(second.original, words)
+        self.assertEqual(PairWord.objects.get(pk=first.pk).original_key, 'renamed')
+
+        self.dictionary.refresh_from_db()
+        self.assertEqual(self.dictionary.word_count, 4)
+
+    def test_duplicate_original_rolls_back_all_changes(self):
+        first, second, third = self.words[:3]
+        response = self.post({
+            f'word-{first.pk}-original': first.original, f'word-{first.pk}-translation': first.translation,
+            f'word-{first.pk}-delete': 'on',
+            f'word-{second.pk}-original': third.original, f'word-{second.pk}-translation': 'дубликат',
+        })
+
+        self.assertContains(response, 'the dictionary already has such a word')
+        self.assertEqual(len(self.get_words()), 5)
+        self.dictionary.refresh_from_db()
+        self.assertEqual(self.dictionary.word_count, 5)
+
+    def test_invalid_rows_are_rejected(self):
+        word = self.words[0]
+        for original in ('   ', 'a' * 151):
+            with self.subTest(original=original):
+                response = self.post({f'word-{word.pk}-original': original,
+                                      f'word-{word.pk}-translation': 'перевод'})
+
+                self.assertContains(response, 'the changes were not saved')
+                self.assertEqual(PairWord.objects.get(pk=word.pk).original, word.original)
+
+    def test_words_of_other_dictionaries_are_ignored(self):
+        other = Dictionary.objects.create(title='Other', user=create_user('other'))
+        foreign_word = PairWord.objects.create(original='foreign', translation='чужое', dictionary=other)
+        self.post({f'word-{foreign_word.pk}-original': foreign_word.original,
+                   f'word-{foreign_word.pk}-translation': foreign_word.translation,
+                   f'word-{foreign_word.pk}-delete': 'on'})
+
+        self.assertTrue(PairWord.objects.filter(pk=foreign_word.pk).exists())
+
+
+class SeededPermutationTest(SimpleTestCase):
+
+    def test_is_permutation(self):
+        for size in (1, 2, 3, 17, 1000):
+            with self.subTest(size=size):
+                permutation = SeededPermutation(size, seed=42)
+                self.assertEqual(len(permutation), size)
+                self.assertEqual(sorted(permutation[i] for i in range(size)), list(range(size)))
+
+    def test_order_depends_only_on_seed(self):
+        def order(seed):
+            return [SeededPermutation(100, seed)[i] for i in range(100)]
+
+        self.assertEqual(order(1), order(1))
+        self.assertNotEqual(order(1), order(2))
+        self.assertNotEqual(order(1), list(range(100)))
+
+    def test_index_out_of_range(self):
+        permutation = SeededPermutation(5, seed=1)
+        for index in (-1, 5):
+            with self.assertRaises(IndexError):
+                permutation[index]
+
+
+class RepeatWordsViewTest(TestCase):
+    """Повторение словаря хранит в кэше только seed и позицию, а не список слов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('repeat')
+        cls.dictionary = Dictionary.objects.create(title='Repeat', user=cls.user)
+        cls.words = PairWord.objects.bulk_create([
+            PairWord(original=f'word {i}', translation=f'слово {i}', dictionary=cls.dictionary) for i in range(6)
+        ])
+        cls.dictionary.update_word_count(6)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('words:repeat_words', kwargs={'dict_slug': self.dictionary.slug})
+
+    def test_every_word_is_shown_once(self):
+        self.client.get(self.url)
+        deleted = self.words[0]
+        deleted.delete()
+
+        shown = []
+        for _ in range(len(self.words)):
+            response = self.client.post(self.url, {'user_answer': 'answer'})
+            if response.status_code == 302:
+                break
+            shown.append(response.context['custom_messages']['original'])
+
+        self.assertRedirects(response, reverse('words:congratulations'), fetch_redirect_response=False)
+        self.assertCountEqual(shown, [word.original for word in self.words[1:]])
+        self.assertNotIn('repeat', self.client.session.keys())
+
+
+class CheckAnswerViewTest(TestCase):
+    """JSON-проверка ответа в режиме обучения работает с пачкой из StudyStateService без рендеринга шаблона."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('answer')
+        cls.dictionary = Dictionary.objects.create(title='Answer', user=cls.user)
+        cls.words = PairWord.objects.bulk_create([
+            PairWord(original='apple', translation='яблоко', dictionary=cls.dictionary),
+            PairWord(original='house', translation='дом', dictionary=cls.dictionary),
+        ])
+        WordProgress.objects.bulk_create([
+            WordProgress(user=cls.user, dictionary=cls.dictionary, pair_word=word, due_at=timezone.now())
+            for word in cls.words
+        ])
+        cls.learning_data = UserLearningData.objects.create(
+            user=cls.user, dictionary=cls.dictionary, session_active=True, next_level_point=2
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('words:check_answer', kwargs={'dict_slug': self.dictionary.slug})
+
+    def start_study(self, point: int = 0):
+        scheduler = SpacedRepetitionService(self.learning_data)
+        study_words = [
+            scheduler.make_study_word(word.pk, word.original, word.translation, box=0) for word in self.words
+        ]
+        for study_word in study_words:
+            study_word['point'] = point
+        StudyStateService(self.user.pk, self.dictionary.pk).start(study_words)
+
+    def test_word_graduates_at_next_level_point(self):
+        self.start_study(point=1)
+
+        response = self.client.post(self.url, {'user_answer': 'Apple'})
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertTrue(result['correct'])
+        self.assertEqual(result['point'], 'pair goes to the next level')
+        self.assertEqual(result['next_word'], {'translation': 'дом', 'box': 0})
+        self.assertEqual(WordProgress.objects.get(pair_word=self.words[0]).box, 1)
+        self.assertEqual(WordStatistics.objects.get(pair_word=self.words[0]).right_answers, 1)
+
+        learning_data = UserLearningData.objects.get(pk=self.learning_data.pk)
+        self.assertEqual((learning_data.current_word_index, learning_data.version), (0, 1))
+        study_words = StudyStateService(self.user.pk, self.dictionary.pk).load(learning_data.next_level_point)
+        self.assertEqual([study_word['id'] for study_word in study_words], [self.words[1].pk])
+
+    def test_wrong_answer_keeps_word(self):
+        self.start_study()
+
+        result = self.client.post(self.url, {'user_answer': 'orange'}).json()
+
+        self.assertFalse(result['correct'])
+        self.assertEqual(result['point'], 'point: -1')
+        self.assertEqual(result['next_word']['translation'], 'дом')
+        self.assertEqual(WordStatistics.objects.get(pair_word=self.words[0]).wrong_answers, 1)
+        self.assertEqual(UserLearningData.objects.get(pk=self.learning_data.pk).current_word_index, 1)
+
+    def test_study_session_is_not_started(self):
+        response = self.client.post(self.url, {'user_answer': 'apple'})
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_anonymous_user(self):
+        self.client.logout()
+
+        self.assertEqual(self.client.post(self.url, {'user_answer': 'apple'}).status_code, 401)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+
+def edit_distance(source: str, target: str) -> int:
+    previous = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        current = [i]
+        for j, target_char in enumerate(target, 1):
+            current.append(min(previous[j - 1] + (source_char != target_char), previous[j] + 1, current[j - 1] + 1))
+        previous = current
+    return previous[-1]
+
+
+class MatchAnswerTest(SimpleTestCase):
+
+    def test_bounded_edit_distance(self):
+        random = Random(0)
+        for _ in range(500):
+            source = ''.join(random.choices('abc', k=random.randint(0, 8)))
+            target = ''.join(random.choices('abc', k=random.randint(0, 8)))
+            limit = random.randint(0, 3)
+            with self.subTest(source=source, target=target, limit=limit):
+                self.assertEqual(bounded_edit_distance(source, target, limit),
+                                 min(edit_distance(source, target), limit + 1))
+
+    def test_match_answer(self):
+        cases = [
+            ('apple', 'apple', MATCH_EXACT),
+            ('  Apple! ', 'apple', MATCH_EXACT),
+            ('the apple', 'an apple', MATCH_EXACT),
+            ('aple', 'apple', MATCH_NEAR),
+            ('aplpe', 'apple', MATCH_WRONG),
+            ('informaton', 'information', MATCH_NEAR),
+            ('imformaton', 'information', MATCH_NEAR),
+            ('cat', 'car', MATCH_WRONG),
+            ('pear', 'apple', MATCH_WRONG),
+            ('', 'apple', MATCH_WRONG),
+            ('the', 'the', MATCH_EXACT),
+        ]
+        for user_answer, original, match in cases:
+            with self.subTest(user_answer=user_answer, original=original):
+                self.assertEqual(match_answer(user_answer, get_answer_alternatives(original)), match)
+
+    def test_alternatives(self):
+        alternatives = get_answer_alternatives('to run; to go, a walk')
+
+        self.assertEqual(alternatives, ['to run; to go, a walk', 'to run', 'to go', 'walk'])
+        self.assertEqual(match_answer('to go', alternatives), MATCH_EXACT)
+        self.assertEqual(match_answer('walk', alternatives), MATCH_EXACT)
+        self.assertEqual(match_answer('to rum', alternatives), MATCH_NEAR)
+        self.assertEqual(match_answer('to swim', alternatives), MATCH_WRONG)
+
+
+class DictionarySlugTest(TestCase):
+    """Слаги словарей уникальны в пределах пользователя и подбираются одним запросом на пачку заголовков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('slugs')
+        cls.other_user = create_user('other_slugs')
+
+    def test_make_unique_slugs(self):
+        self.assertEqual(make_unique_slugs(['words', 'words', 'verbs'], {'words', 'words-2'}),
+                         ['words-3', 'words-4', 'verbs'])
+
+        base = 'x' * SLUG_MAX_LENGTH
+        self.assertEqual(make_unique_slugs([base], {base}), ['x' * (SLUG_MAX_LENGTH - 2) + '-2'])
+
+    def test_bulk_create(self):
+        Dictionary.objects.create(title='My Words', user=self.user)
+
+        # по одному запросу занятых слагов на пользователя и одна вставка
+        with self.assertNumQueries(3):
+            dictionaries = Dictionary.objects.bulk_create([
+                Dictionary(title='My Words', user=self.user),
+                Dictionary(title='My  words', user=self.user),
+                Dictionary(title='My Words', user=self.other_user),
+            ])
+
+        self.assertEqual([dictionary.slug for dictionary in dictionaries], ['my-words-2', 'my-words-3', 'my-words'])
+
+    def test_bulk_create_many_titles(self):
+        Dictionary.objects.create(title='Title 7', user=self.user)
+        titles = [f'Title {number}' for number in range(1200)] + ['Title 7']
+
+        with CaptureQueriesContext(connection) as queries:
+            dictionaries = Dictionary.objects.bulk_create([Dictionary(title=title, user=self.user) for title in titles])
+
+        slugs = [dictionary.slug for dictionary in dictionaries]
+        self.assertEqual(len(set(slugs)), len(titles))
+        self.assertEqual((slugs[0], slugs[7], slugs[-1]), ('title-0', 'title-7-2', 'title-7-3'))
+        selects = [query for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 12)
+
+    def test_slug_changes_with_title(self):
+        Dictionary.objects.create(title='Verbs', user=self.user)
+        dictionary = Dictionary.objects.create(title='Nouns', user=self.user)
+        self.assertEqual(dictionary.slug, 'nouns')
+
+        dictionary.title = 'Verbs'
+        dictionary.save(update_fields=['title'])
+
+        self.assertEqual(Dictionary.objects.get(pk=dictionary.pk).slug, 'verbs-2')
+
+        dictionary = Dictionary.objects.get(pk=dictionary.pk)
+        dictionary.save()
+        self.assertEqual(dictionary.slug, 'verbs-2')
+
+    def test_save_retries_taken_slug(self):
+        Dictionary.objects.create(title='Taken', user=self.user)
+
+        with mock.patch.object(DictionaryQuerySet, 'get_unique_slugs', side_effect=[['taken'], ['free']]):
+            dictionary = Dictionary.objects.create(title='Taken', user=self.user)
+
+        self.assertEqual(Dictionary.objects.get(pk=dictionary.pk).slug, 'free')
+
+    def test_save_gives_up_after_slug_attempts(self):
+        Dictionary.objects.create(title='Taken', user=self.user)
+
+        with mock.patch.object(DictionaryQuerySet, 'get_unique_slugs', return_value=['taken']) as get_unique_slugs:
+            with self.assertRaises(IntegrityError):
+                Dictionary.objects.create(title='Taken', user=self.user)
+
+        self.assertEqual(get_unique_slugs.call_count, Dictionary.slug_attempts)
+
+
+class StudyStateServiceTest(SimpleTestCase):
+    """Пачка и прогресс обучения хранятся в кэше двумя записями, связанными токеном."""
+
+    def setUp(self):
+        cache.clear()
+        self.state = StudyStateService(user_id=1, dictionary_id=2)
+        self.study_words = [
+            {'id': 10, 'pair': ['apple', 'яблоко'], 'point': 0, 'box': 0, 'answers': ['apple']},
+            {'id': 2 ** 40, 'pair': ['to go, to walk', 'идти'], 'point': 3, 'box': 2,
+             'answers': get_answer_alternatives('to go, to walk')},
+        ]
+
+    def test_round_trip(self):
+        self.state.start(self.study_words)
+
+        loaded = StudyStateService(1, 2).load(next_level_point=5)
+
+        self.assertEqual(loaded, [dict(study_word, position=position)
+                                  for position, study_word in enumerate(self.study_words)])
+
+    def test_graduated_words_are_skipped(self):
+        self.state.start(self.study_words)
+
+        loaded = StudyStateService(1, 2).load(next_level_point=3)
+
+        self.assertEqual([study_word['id'] for study_word in loaded], [10])
+
+    def test_save_writes_only_changed_progress(self):
+        self.state.start(self.study_words)
+        state = StudyStateService(1, 2)
+        study_words = state.load(next_level_point=5)
+
+        with mock.patch.object(cache, 'set') as cache_set:
+            state.save(study_words)
+        cache_set.assert_not_called()
+
+        study_words[1]['point'] += 1
+        study_words[1]['box'] = 3
+        state.save([study_words[1]])
+
+        loaded = StudyStateService(1, 2).load(next_level_point=5)
+        self.assertEqual([(study_word['point'], study_word['box']) for study_word in loaded], [(0, 0), (4, 3)])
+
+    def test_evicted_entry_loses_state(self):
+        for name in ('batch', 'progress'):
+            with self.subTest(name=name):
+                self.state.start(self.study_words)
+                cache.delete(self.state.get_key(name))
+
+                self.assertIsNone(StudyStateService(1, 2).load(next_level_point=5))
+
+    def test_progress_of_other_batch_is_ignored(self):
+        self.state.start(self.study_words)
+        progress = cache.get(self.state.get_key('progress'))
+
+        self.state.start(self.study_words)
+        cache.set(self.state.get_key('progress'), progress)
+
+        self.assertIsNone(StudyStateService(1, 2).load(next_level_point=5))
+
+    def test_states_are_separated(self):
+        self.state.start(self.study_words)
+
+        self.assertIsNone(StudyStateService(1, 3).load(next_level_point=5))
+        self.assertIsNone(StudyStateService(2, 2).load(next_level_point=5))
+
+
+@override_settings(REPLICA_DATABASES=['replica0'], REPLICA_APP_LABELS={'words'})
+class ReplicaRouterTest(SimpleTestCase):
+    """Чтение с реплики только внутри read_from_replica для безопасных методов и без sticky cookie."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    @staticmethod
+    @read_from_replica
+    def view(request):
+        return HttpResponse(f'{Dictionary.objects.all().db} {CustomUser.objects.all().db}')
+
+    def test_db_for_read(self):
+        self.assertEqual(Dictionary.objects.all().db, 'default')
+
+        token = read_replica.set('replica0')
+        try:
+            self.assertEqual(Dictionary.objects.all().db, 'replica0')
+            self.assertEqual(CustomUser.objects.all().db, 'default')
+        finally:
+            read_replica.reset(token)
+
+    def test_read_from_replica(self):
+        cases = [
+            (self.factory.get('/'), b'replica0 default'),
+            (self.factory.head('/'), b'replica0 default'),
+            (self.factory.post('/'), b'default default'),
+        ]
+        sticky_request = self.factory.get('/')
+        sticky_request.COOKIES[STICKY_COOKIE] = '1'
+        cases.append((sticky_request, b'default default'))
+
+        for request, content in cases:
+            with self.subTest(method=request.method, cookies=request.COOKIES):
+                self.assertEqual(self.view(request).content, content)
+                self.assertIsNone(read_replica.get())
+
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertEqual(self.view(self.factory.get('/')).content, b'default default')
+
+    @override_settings(REPLICA_DATABASES=['replica0', 'replica1', 'replica2'])
+    def test_one_replica_per_request(self):
+        @read_from_replica
+        def view(request):
+            return HttpResponse(' '.join({Dictionary.objects.all().db for _ in range(50)}))
+
+        replicas = {view(self.factory.get('/')).content for _ in range(20)}
+
+        self.assertLessEqual(replicas, {b'replica0', b'replica1', b'replica2'})
+        self.assertGreater(len(replicas), 1)
+
+    def test_template_response_is_rendered_on_replica(self):
+        @read_from_replica
+        def view(request):
+            template = engines['django'].from_string('{{ db }}')
+            return SimpleTemplateResponse(template, {'db': lambda: Dictionary.objects.all().db})
+
+        response = view(self.factory.get('/'))
+
+        self.assertTrue(response.is_rendered)
+        self.assertEqual(response.content, b'replica0')
+
+    def process(self, request, write: bool) -> HttpResponse:
+        middleware = ReplicaStickyMiddleware(lambda request: HttpResponse())
+        middleware.process_request(request)
+        if write:
+            self.assertEqual(ReplicaRouter().db_for_write(PairWord), 'default')
+        return middleware.process_response(request, HttpResponse())
+
+    def test_sticky_cookie_after_write(self):
+        self.assertIn(STICKY_COOKIE, self.process(self.factory.get('/'), write=True).cookies)
+        self.assertIn(STICKY_COOKIE, self.process(self.factory.post('/'), write=False).cookies)
+        self.assertNotIn(STICKY_COOKIE, self.process(self.factory.get('/'), write=False).cookies)
+
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertNotIn(STICKY_COOKIE, self.process(self.factory.post('/'), write=True).cookies)
+
+
+# реплика из DATABASES_REPLICA_URLS: в тестах у неё своя база, а не зеркало default
+SEPARATE_REPLICA = next((alias for alias in settings.REPLICA_DATABASES
+                         if not settings.DATABASES[alias].get('TEST', {}).get('MIRROR')), None)
+
+
+@skipUnless(SEPARATE_REPLICA, 'DATABASES_REPLICA_URLS is not set')
+@override_settings(REPLICA_DATABASES=[SEPARATE_REPLICA])
+class ReplicaDatabaseTest(TestCase):
+    """Представления с read_from_replica действительно читают из реплики, а после записи - из default."""
+    databases = {'default', SEPARATE_REPLICA} if SEPARATE_REPLICA else {'default'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('replica')
+        # реплика отстаёт: в ней тот же словарь, но со старым набором слов
+        for alias, original in (('default', 'primary word'), (SEPARATE_REPLICA, 'replica word')):
+            CustomUser.objects.using(alias).get_or_create(pk=cls.user.pk, defaults={
+                'username': cls.user.username, 'email': cls.user.email, 'phone': cls.user.phone,
+            })
+            dictionary, = Dictionary.objects.using(alias).bulk_create([Dictionary(title='Words', user_id=cls.user.pk)])
+            PairWord.objects.using(alias).create(original=original, translation='слово', dictionary=dictionary)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('words:dictionary_words', kwargs={'dict_slug': 'words'})
+
+    def get_originals(self) -> list[str]:
+        return [word['original'] for word in self.client.get(self.url).json()['words']]
+
+    def test_reads_from_replica(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual([word['original'] for word in response.json()['words']], ['replica word'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_reads_from_default_after_write(self):
+        dictionary = Dictionary.objects.using('default').get(user=self.user)
+        response = self.client.post(reverse('words:add_new_words'), {
+            'dictionary': dictionary.pk, 'original_word': 'new word', 'translation_word': 'новое слово',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.get_originals(), ['new word', 'primary word'])
+
+        self.client.cookies.pop(STICKY_COOKIE)
+        self.assertEqual(self.get_originals(), ['replica word'])
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    """Одновременные асинхронные запросы делят поток ORM, но считают только свои SQL-запросы."""
+
+    async def test_concurrent_async_requests(self):
+        async def view(request):
+            for _ in range(request.queries):
+                await Dictionary.objects.acount()
+                await asyncio.sleep(0.01)
+            return HttpResponse()
+
+        def make_request(queries: int):
+            request = RequestFactory().get('/')
+            request.queries = queries
+            return request
+
+        middleware = RequestMetricsMiddleware(view)
+        with mock.patch.object(RequestMetricsMiddleware, 'observe') as observe:
+            # первый запрос завершается последним
+            await asyncio.gather(middleware(make_request(3)), middleware(make_request(1)))
+
+        counts = {call.args[0].queries: call.args[1].count for call in observe.call_args_list}
+        self.assertEqual(counts, {3: 3, 1: 1})
+
+        with mock.patch.object(RequestMetricsMiddleware, 'observe') as observe:
+            await middleware(make_request(2))
+        self.assertEqual(observe.call_args.args[1].count, 2)
+
+    def test_sync_request(self):
+        def view(request):
+            Dictionary.objects.count()
+            return HttpResponse()
+
+        with mock.patch.object(RequestMetricsMiddleware, 'observe') as observe:
+            RequestMetricsMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(observe.call_args.args[1].count, 1)
+
+
+class JobServiceTest(TestCase):
+    """Очередь фоновых задач: захват условным UPDATE, ошибки и удаление устаревших файлов экспорта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('jobs')
+        cls.dictionary = Dictionary.objects.create(title='Jobs', user=cls.user)
+        PairWord.objects.create(original='apple', translation='яблоко', dictionary=cls.dictionary)
+        cls.dictionary.update_word_count(1)
+
+    def setUp(self):
+        use_temporary_media_root(self)
+
+    def enqueue_delete(self) -> Job:
+        return JobService.enqueue(self.user, jobs.DELETE_DICTIONARY, dictionary_id=self.dictionary.pk)
+
+    def test_claim_next(self):
+        first, second = self.enqueue_delete(), self.enqueue_delete()
+
+        claimed = JobService.claim_next()
+
+        self.assertEqual(claimed.job.pk, first.pk)
+        self.assertEqual(claimed.job.status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.RUNNING)
+        self.assertEqual(JobService.claim_next().job.pk, second.pk)
+        self.assertIsNone(JobService.claim_next())
+
+    def test_claim_skips_job_taken_by_other_worker(self):
+        first, second = self.enqueue_delete(), self.enqueue_delete()
+        now = timezone.now
+
+        def claim_by_other_worker():
+            # другой воркер захватывает задачу между выбором кандидатов и UPDATE
+            Job.objects.filter(pk=first.pk, status=Job.PENDING).update(status=Job.RUNNING)
+            return now()
+
+        with mock.patch('words.services.job_service.timezone.now', side_effect=claim_by_other_worker) as patched_now:
+            claimed = JobService.claim_next()
+
+        self.assertEqual(patched_now.call_count, 2)
+        self.assertEqual(claimed.job.pk, second.pk)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            JobService.enqueue(self.user, 'unknown')
+
+    def test_failed_import_keeps_upload(self):
+        name = default_storage.save('jobs/upload.txt', ContentFile('apple - яблоко\n'.encode()))
+        JobService.enqueue(self.user, jobs.IMPORT_WORDS, dictionary_id=self.dictionary.pk, file=name, sep=' - ',
+                           on_conflict=ImportWordsService.SKIP_DUPLICATES)
+
+        with mock.patch.object(ImportWordsService, 'import_file', side_effect=ValueError('broken file')), \
+                self.assertLogs('words.services.job_service', 'ERROR'):
+            JobService.claim_next().run()
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.error), (Job.FAILED, 'broken file'))
+        self.assertIsNotNone(job.finished_at)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_delete_expired_files(self):
+        for _ in range(2):
+            JobService.enqueue(self.user, jobs.EXPORT_WORDS, export_format='text', sep=' - ', compress=False)
+            JobService.claim_next().run()
+        expired, fresh = Job.objects.order_by('id')
+        Job.objects.filter(pk=expired.pk).update(finished_at=timezone.now() - timedelta(hours=25))
+
+        self.assertEqual(JobService.delete_expired_files(timedelta(hours=24)), 1)
+
+        self.assertFalse(default_storage.exists(expired.result['file']))
+        self.assertTrue(default_storage.exists(fresh.result['file']))
+        expired.refresh_from_db()
+        self.assertNotIn('file', expired.result)
+        self.assertIn('report', expired.result)
+        self.assertEqual(JobService.delete_expired_files(timedelta(hours=24)), 0)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('words:job_file', args=[expired.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('words:job_file', args=[fresh.pk])).status_code, 200)
+
+
+class RunJobsCommandTest(TransactionTestCase):
+    """run_jobs выполняет задачи в потоках, поэтому данные должны быть видны из других подключений."""
+
+    def setUp(self):
+        use_temporary_media_root(self)
+        self.user = create_user('run_jobs')
+        self.dictionary = Dictionary.objects.create(title='Run Jobs', user=self.user)
+
+    def run_jobs(self, *args) -> str:
+        stdout = StringIO()
+        call_command('run_jobs', '--once', '--workers', '1', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_retry_failed_import(self):
+        name = default_storage.save('jobs/upload.txt', ContentFile('apple - яблоко\n'.encode()))
+        job = JobService.enqueue(self.user, jobs.IMPORT_WORDS, dictionary_id=self.dictionary.pk, file=name,
+                                 sep=' - ', on_conflict=ImportWordsService.SKIP_DUPLICATES)
+
+        with mock.patch.object(ImportWordsService, 'import_file', side_effect=ValueError('broken file')), \
+                self.assertLogs('words.services.job_service', 'ERROR'):
+            self.run_jobs()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+        output = self.run_jobs('--retry-failed')
+
+        self.assertIn('Requeued 1 failed jobs', output)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.DONE, ''))
+        self.assertEqual(list(PairWord.objects.values_list('original', flat=True)), ['apple'])
+        self.assertFalse(default_storage.exists(name))
+
+    def test_requeue_running(self):
+        job = JobService.enqueue(self.user, jobs.DELETE_DICTIONARY, dictionary_id=self.dictionary.pk)
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING, started_at=timezone.now())
+
+        self.assertNotIn('Finished', self.run_jobs())
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+
+        output = self.run_jobs('--requeue-running')
+
+        self.assertIn('Requeued 1 running jobs', output)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+        self.assertFalse(Dictionary.objects.filter(pk=self.dictionary.pk).exists())
+
+
+class ExportWordsTest(TestCase):
+    """Экспорт в text, CSV и TSV читается обратно ImportWordsService без потерь."""
+    pairs = {'apple': 'яблоко', 'one, two': 'один; "два"', 'with\ttab': 'с табуляцией', 'a - b': 'а = б'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('export')
+        cls.dictionary = Dictionary.objects.create(title='Source', user=cls.user)
+        ImportWordsService(cls.dictionary, sep='').import_pairs(cls.pairs.items())
+        cls.dictionary.update_word_count(len(cls.pairs))
+
+    def export(self, export_format: str, sep: str = ' - ', compress: bool = False) -> tuple[str, bytes]:
+        export_service = ExportWordsService([self.dictionary], export_format, sep, compress)
+        export_service.buffer_size = 16
+        chunks = list(export_service)
+        self.assertEqual(export_service.exported, len(self.pairs))
+        return export_service.get_filename('source'), b''.join(chunks)
+
+    def import_back(self, filename: str, data: bytes, sep: str) -> dict[str, str]:
+        target = Dictionary.objects.create(title='Target', user=self.user)
+        ImportWordsService(target, sep).import_file(SimpleUploadedFile(filename, data))
+        return dict(PairWord.objects.filter(dictionary=target).values_list('original', 'translation'))
+
+    def test_text_round_trip(self):
+        for sep, filename in ((',', 'source.csv'), ('\t', 'source.tsv'), (' | ', 'source.txt')):
+            with self.subTest(sep=sep):
+                exported_name, data = self.export(ExportWordsService.TEXT, sep)
+
+                self.assertEqual(exported_name, filename)
+                self.assertEqual(self.import_back(filename, data, sep), self.pairs)
+
+    def test_csv_quoting(self):
+        _, data = self.export(ExportWordsService.TEXT, ',')
+
+        rows = list(csv.reader(data.decode().splitlines()))
+        self.assertIn(['one, two', 'один; "два"'], rows)
+        self.assertIn('"one, two","один; ""два"""', data.decode())
+
+    def test_json_lines(self):
+        filename, data = self.export(ExportWordsService.JSON_LINES)
+
+        self.assertEqual(filename, 'source.jsonl')
+        rows = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual({row['original']: row['translation'] for row in rows}, self.pairs)
+        self.assertEqual({row['dictionary'] for row in rows}, {'Source'})
+
+    def test_anki(self):
+        filename, data = self.export(ExportWordsService.ANKI)
+
+        self.assertEqual(filename, 'source.txt')
+        text = data.decode()
+        self.assertTrue(text.startswith(ExportWordsService.anki_header))
+        rows = list(csv.reader(text[len(ExportWordsService.anki_header):].splitlines(), delimiter='\t'))
+        self.assertEqual({original: translation for original, translation, _ in rows}, self.pairs)
+        self.assertEqual({deck for _, _, deck in rows}, {'Source'})
+
+    def test_gzip(self):
+        for export_format in (ExportWordsService.TEXT, ExportWordsService.JSON_LINES, ExportWordsService.ANKI):
+            with self.subTest(export_format=export_format):
+                filename, data = self.export(export_format, '\t', compress=True)
+
+                self.assertTrue(filename.endswith('.gz'))
+                self.assertEqual(gzip.decompress(data), self.export(export_format, '\t')[1])
+
+    def test_streaming_view(self):
+        self.client.force_login(self.user)
+        url = reverse('words:export_dictionary', kwargs={'dict_slug': self.dictionary.slug})
+
+        response = self.client.get(url, {'sep_choice': ',', 'compress': 'on'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('filename="source.csv.gz"', response['Content-Disposition'])
+        data = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(self.import_back('source.csv', data, ','), self.pairs)
+
+    def test_custom_separator_is_required(self):
+        self.assertFalse(ExportWordsForm({'sep_choice': 'Custom', 'custom_sep': ''}).is_valid())
+        self.assertTrue(ExportWordsForm({'sep_choice': 'Custom', 'custom_sep': '='}).is_valid())
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('words:export_words'), {'sep_choice': 'Custom'})
+        self.assertEqual(response.status_code, 400)
+
+
+def make_zip(files: dict[str, bytes]) -> BytesIO:
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_file:
+        for name, data in files.items():
+            zip_file.writestr(name, data)
+    archive.seek(0)
+    return archive
+
+
+class ImportArchiveServiceTest(TestCase):
+    """Каждый подходящий файл архива становится словарём, ошибка не оставляет пустых словарей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('archive')
+
+    def import_archive(self, files: dict[str, bytes], **limits) -> ImportArchiveService:
+        archive_service = ImportArchiveService(self.user, ' - ')
+        for name, value in limits.items():
+            setattr(archive_service, name, value)
+        archive_service.import_archive(make_zip(files))
+        return archive_service
+
+    def get_dictionaries(self) -> dict[str, dict[str, str]]:
+        return {
+            dictionary.title: dict(dictionary.pairword_set.values_list('original', 'translation'))
+            for dictionary in Dictionary.objects.filter(user=self.user)
+        }
+
+    def test_import(self):
+        archive_service = self.import_archive({
+            'verbs.txt': 'go - идти\nrun - бежать\n'.encode(),
+            'nested/nouns.csv': 'cat,кошка\nbroken row\n"a, b",c\n'.encode(),
+            'notes.md': b'not a dictionary',
+            '.hidden.txt': b'x - y',
+            '__MACOSX/verbs.txt': b'x - y',
+            'empty/': b'',
+        })
+
+        self.assertEqual(self.get_dictionaries(), {
+            'verbs': {'go': 'идти', 'run': 'бежать'},
+            'nouns': {'cat': 'кошка', 'a, b': 'c'},
+        })
+        self.assertEqual(str(archive_service), 'dictionaries: 2, words inserted: 4')
+        self.assertEqual({dictionary.title: report.malformed for dictionary, report in archive_service.reports},
+                         {'verbs': 0, 'nouns': 1})
+        self.assertEqual(Dictionary.objects.get(title='verbs').word_count, 2)
+
+    def test_limits(self):
+        files = {'verbs.txt': 'go - идти\n'.encode(), 'large.txt': b'word - translation\n' * 100}
+        cases = [
+            ({'max_file_size': 1000}, 'large.txt is larger than'),
+            ({'max_files': 1}, 'more than 1 files'),
+            ({'max_archive_size': 1000}, 'The archive is larger than'),
+        ]
+        for limits, message in cases:
+            with self.subTest(limits=limits):
+                with self.assertRaisesMessage(ImportArchiveError, message):
+                    self.import_archive(files, **limits)
+                self.assertFalse(Dictionary.objects.exists())
+
+    def test_no_dictionary_files(self):
+        with self.assertRaisesMessage(ImportArchiveError, 'no .txt, .csv or .tsv files'):
+            self.import_archive({'notes.md': b'text'})
+
+        with self.assertRaisesMessage(ImportArchiveError, 'not a zip archive'):
+            ImportArchiveService(self.user, ' - ').import_archive(BytesIO(b'not a zip'))
+
+    def test_failed_write_leaves_no_dictionary(self):
+        with mock.patch.object(ImportWordsService, 'import_pairs', side_effect=ValueError('write failed')):
+            with self.assertRaisesMessage(ValueError, 'write failed'):
+                self.import_archive({'verbs.txt': 'go - идти\n'.encode()})
+
+        self.assertFalse(Dictionary.objects.exists())
+
+
+# данные создаются на default, поэтому представления не должны читать с реплик
+@override_settings(REPLICA_DATABASES=[])
+class DictionaryWordsViewTest(TestCase):
+    """Слова словаря отдаются страницами по курсору id < cursor, от новых к старым."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('pages')
+        cls.dictionary = Dictionary.objects.create(title='Pages', user=cls.user)
+        PairWord.objects.bulk_create([
+            PairWord(original=f'word {i}', translation=f'слово {i}', dictionary=cls.dictionary) for i in range(250)
+        ])
+        cls.word_ids = sorted(PairWord.objects.filter(dictionary=cls.dictionary).values_list('id', flat=True),
+                              reverse=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('words:dictionary_words', kwargs={'dict_slug': self.dictionary.slug})
+
+    def test_cursor_pages(self):
+        word_ids = []
+        params = {'limit': 60}
+        while True:
+            data = self.client.get(self.url, params).json()
+            word_ids.extend(word['id'] for word in data['words'])
+            if data['next_cursor'] is None:
+                break
+            self.assertEqual(data['next_cursor'], word_ids[-1])
+            params['cursor'] = data['next_cursor']
+
+        self.assertEqual(word_ids, self.word_ids)
+        self.assertEqual(len(data['words']), 250 % 60)
+
+    def test_limit_is_clamped(self):
+        for limit, size in (('', 50), ('0', 1), ('-5', 1), ('1000', 200)):
+            with self.subTest(limit=limit):
+                params = {'limit': limit} if limit else {}
+                self.assertEqual(len(self.client.get(self.url, params).json()['words']), size)
+
+    def test_bad_parameters(self):
+        for params in ({'cursor': 'abc'}, {'limit': '1.5'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_other_users_dictionary(self):
+        self.client.force_login(create_user('stranger'))
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class MetricsViewTest(TestCase):
+    """/metrics/ отдаёт гистограммы Prometheus по METRICS_TOKEN или, без него, адресам INTERNAL_IPS."""
+
+    def setUp(self):
+        self.url = reverse('metrics')
+
+    @override_settings(METRICS_TOKEN='', INTERNAL_IPS=['127.0.0.1'])
+    def test_prometheus_output(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        self.assertIn(f'# TYPE {REQUEST_DURATION.name} histogram', lines)
+        self.assertIn(f'{REQUEST_DURATION.name}_bucket{{view="metrics",le="+Inf"}}', response.content.decode())
+        self.assertTrue(any(line.startswith(f'{REQUEST_DURATION.name}_count{{view="metrics"}} ') for line in lines))
+
+    @override_settings(METRICS_TOKEN='', INTERNAL_IPS=['10.0.0.1'])
+    def test_internal_ips_without_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret', INTERNAL_IPS=['127.0.0.1'])
+    def test_token(self):
+        cases = [
+            ({'HTTP_AUTHORIZATION': 'Bearer secret'}, 200),
+            ({'HTTP_AUTHORIZATION': 'Bearer wrong'}, 404),
+            ({'HTTP_AUTHORIZATION': 'secret'}, 404),
+            # с токеном адрес из INTERNAL_IPS доступа не даёт
+            ({}, 404),
+        ]
+        for headers, status_code in cases:
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(self.url, **headers).status_code, status_code)
+
+
+# данные создаются на default, поэтому представления не должны читать с реплик
+@override_settings(REPLICA_DATABASES=[])
+class WordStatisticsTest(TestCase):
+    """Счётчики ответов меняются F()-выражениями, а самые частые ошибки выбираются по всем словарям."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('statistics')
+        cls.other_user = create_user('other_statistics')
+        words = []
+        for title in ('Verbs', 'Nouns'):
+            dictionary = Dictionary.objects.create(title=title, user=cls.user)
+            words.extend(PairWord.objects.bulk_create([
+                PairWord(original=f'{title} {i}', translation=f'перевод {i}', dictionary=dictionary) for i in range(3)
+            ]))
+        cls.words = words
+
+    def setUp(self):
+        cache.clear()
+        self.service = WordStatisticsService(self.user)
+
+    def get_counters(self, word: PairWord) -> tuple[int, int]:
+        return WordStatistics.objects.values_list('right_answers', 'wrong_answers').get(user=self.user, pair_word=word)
+
+    def test_record_answer(self):
+        word = self.words[0]
+        self.service.record_answer(word.pk, correct=False)
+        self.assertEqual(self.get_counters(word), (0, 1))
+
+        # существующая строка обновляется одним UPDATE без чтения
+        with self.assertNumQueries(1):
+            self.service.record_answer(word.pk, correct=False)
+        self.service.record_answer(word.pk, correct=True)
+
+        self.assertEqual(self.get_counters(word), (1, 2))
+
+    def test_record_answer_after_concurrent_create(self):
+        word = self.words[0]
+        WordStatistics.objects.create(user=self.user, pair_word=word, right_answers=1)
+        update = QuerySet.update
+        updates = []
+
+        def update_before_other_request(queryset, **kwargs):
+            # первый UPDATE выполнился до того, как параллельный запрос создал строку
+            updates.append(kwargs)
+            return 0 if len(updates) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_before_other_request):
+            self.service.record_answer(word.pk, correct=True)
+
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.get_counters(word), (2, 0))
+
+    async def test_arecord_answer(self):
+        word = self.words[1]
+        for correct in (False, True, False):
+            await self.service.arecord_answer(word.pk, correct)
+
+        counters = await WordStatistics.objects.filter(user=self.user, pair_word=word).values_list(
+            'right_answers', 'wrong_answers').aget()
+        self.assertEqual(counters, (1, 2))
+
+    def record_mistakes(self, mistakes: dict[int, int]):
+        for index, count in mistakes.items():
+            for _ in range(count):
+                self.service.record_answer(self.words[index].pk, correct=False)
+
+    def test_most_missed_across_dictionaries(self):
+        self.record_mistakes({0: 2, 4: 5, 5: 1, 2: 3})
+        self.service.record_answer(self.words[1].pk, correct=True)
+        WordStatisticsService(self.other_user).record_answer(self.words[3].pk, correct=False)
+
+        most_missed = self.service.get_most_missed(limit=3)
+
+        self.assertEqual(most_missed, [
+            (self.words[4].pk, 'Nouns 1', 'перевод 1', 5),
+            (self.words[2].pk, 'Verbs 2', 'перевод 2', 3),
+            (self.words[0].pk, 'Verbs 0', 'перевод 0', 2),
+        ])
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('words:error_words'))
+        self.assertEqual([original for _, original, _, _ in response.context['error_words']],
+                         ['Nouns 1', 'Verbs 2', 'Verbs 0', 'Nouns 2'])
+
+    def test_review_mistakes(self):
+        self.record_mistakes({0: 1, 3: 4, 5: 2})
+        self.client.force_login(self.user)
+        url = reverse('words:review_mistakes')
+
+        self.client.get(url)
+        shown = []
+        for _ in range(len(self.words)):
+            response = self.client.post(url, {'user_answer': 'answer'})
+            if response.status_code == 302:
+                break
+            shown.append(response.context['custom_messages']['original'])
+
+        self.assertRedirects(response, reverse('words:congratulations'), fetch_redirect_response=False)
+        self.assertEqual(shown, ['Nouns 0', 'Nouns 2', 'Verbs 0'])
+
+
+class DuplicateWordsTest(TestCase):
+    """Дубликаты между словарями ищутся по original_key, а rebuild_word_keys пересчитывает ключи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('duplicates')
+        cls.verbs = Dictionary.objects.create(title='Verbs', user=cls.user)
+        cls.nouns = Dictionary.objects.create(title='Nouns', user=cls.user)
+        cls.other = Dictionary.objects.create(title='Other', user=create_user('other_duplicates'))
+        for dictionary, originals in ((cls.verbs, ['Apple', 'cafe', 'café', 'resume']),
+                                      (cls.nouns, ['apple ', 'Résumé', 'house']),
+                                      (cls.other, ['apple', 'run', 'resume'])):
+            PairWord.objects.bulk_create([
+                PairWord(original=original, translation='перевод', dictionary=dictionary) for original in originals
+            ])
+
+    def get_duplicates(self, limit: int = 10) -> dict[str, list[str]]:
+        return {
+            duplicate['key']: [word['dictionary__title'] for word in duplicate['words']]
+            for duplicate in WordSearchService(self.user).get_duplicates(limit)
+        }
+
+    def rebuild_word_keys(self) -> str:
+        stdout = StringIO()
+        call_command('rebuild_word_keys', '--batch-size', '2', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_get_duplicates(self):
+        self.assertEqual(self.get_duplicates(), {'apple': ['Nouns', 'Verbs']})
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('words:duplicate_words'))
+        self.assertEqual([duplicate['key'] for duplicate in response.context['duplicates']], ['apple'])
+
+    def test_rebuild_after_folding_diacritics(self):
+        self.assertIn('Rebuilt 0 word keys, 0 conflicts', self.rebuild_word_keys())
+
+        with override_settings(WORDS_FOLD_DIACRITICS=True):
+            output = self.rebuild_word_keys()
+
+            cafe = PairWord.objects.get(dictionary=self.verbs, original='café')
+            self.assertIn(f'word {cafe.pk} "café" duplicates another word of dictionary {self.verbs.pk}', output)
+            self.assertIn('Rebuilt 1 word keys, 1 conflicts', output)
+            self.assertEqual(cafe.original_key, 'café')
+            self.assertEqual(PairWord.objects.get(dictionary=self.nouns, original='Résumé').original_key, 'resume')
+            self.assertEqual(PairWord.objects.get(dictionary=self.other, original='resume').original_key, 'resume')
+
+            self.assertIn('Rebuilt 0 word keys, 1 conflicts', self.rebuild_word_keys())
+
+        # после свёртки résumé и resume из разных словарей стали дубликатами
+        self.assertEqual(self.get_duplicates(), {'apple': ['Nouns', 'Verbs'], 'resume': ['Nouns', 'Verbs']})
+        self.assertEqual(self.get_duplicates(limit=1), {'apple': ['Nouns', 'Verbs']})
+
+    def test_rebuild_fixes_stale_keys(self):
+        PairWord.objects.filter(dictionary=self.nouns).update(original_key=Concat('original_key', Value('-stale')))
+
+        self.assertIn('Rebuilt 3 word keys, 0 conflicts', self.rebuild_word_keys())
+        self.assertEqual(self.get_duplicates(), {'apple': ['Nouns', 'Verbs']})
+
+
+class BenchmarkWordsTest(TestCase):
+    """Замеры benchmark_words выполняются без отдельной тестовой базы, сравнение с baseline - на готовых числах."""
+
+    def test_benchmarks_run(self):
+        # 1200 заголовков больше предела глубины выражения SQLite, на котором падал запрос занятых слагов
+        size = 1200
+        user = create_user('benchmark')
+        dictionary = Dictionary.objects.create(title='Benchmark', user=user)
+        PairWord.objects.bulk_create([
+            PairWord(original=f'original {i}', translation=f'translation {i}', dictionary=dictionary)
+            for i in range(size)
+        ])
+        dictionary.update_word_count(size)
+
+        for name, benchmark in BenchmarkWordsCommand().get_benchmarks(user, dictionary, size).items():
+            with self.subTest(name=name):
+                benchmark()
+
+    def test_missing_baseline(self):
+        with self.assertRaisesMessage(CommandError, 'not found, create it with --save'):
+            call_command('benchmark_words', '--baseline', '/nonexistent/baseline.json', stdout=StringIO())
+
+    def test_report(self):
+        command = BenchmarkWordsCommand(stdout=StringIO())
+        baseline = {
+            'same[10]': {'time_ms': 10, 'queries': 2, 'peak_kb': 100},
+            'slower[10]': {'time_ms': 10, 'queries': 2, 'peak_kb': 100},
+            'more_queries[10]': {'time_ms': 10, 'queries': 2, 'peak_kb': 100},
+        }
+        results = {
+            'same[10]': {'time_ms': 12, 'queries': 2, 'peak_kb': 90},
+            'slower[10]': {'time_ms': 13, 'queries': 2, 'peak_kb': 100},
+            'more_queries[10]': {'time_ms': 10, 'queries': 3, 'peak_kb': 100},
+            'new[10]': {'time_ms': 10, 'queries': 2, 'peak_kb': 100},
+        }
+
+        self.assertEqual(command.report(results, baseline, tolerance=0.25), 2)
+
+        output = command.stdout.getvalue()
+        self.assertIn('slower[10]: time_ms 10 -> 13', output)
+        self.assertIn('more_queries[10]: queries 2 -> 3', output)
+        self.assertIn('new[10]: not in baseline', output)
+        self.assertNotIn('same[10]:', output)
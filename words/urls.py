@@ -1,27 +1,47 @@
 from django.contrib.auth.decorators import login_required
 from django.urls import path
 
-from words.views import (AddDictionaryView, AddPairWordView, ImportWordsView,
-                         RepeatWordsView, ShowAllDictionaryUserView,
-                         ShowDictionaryView, StudyWordsView,
-                         UpdateDictionaryView, delete_dictionary, reset,
-                         show_error_words)
+from common.db_router import read_from_replica
+
+from words.views import (AddDictionaryView, AddPairWordView,
+                         DuplicateWordsView, ImportArchiveView,
+                         ImportWordsView, JobView, RepeatWordsView,
+                         ReviewMistakesView, SearchWordsView,
+                         ShowAllDictionaryUserView, ShowDictionaryView,
+                         StudyWordsView, UpdateDictionaryView,
+                         autocomplete_words, check_answer, delete_dictionary,
+                         dictionary_words, export_words, job_file, job_status,
+                         reset, show_error_words)
 
 app_name = 'words'
 
 urlpatterns = [
     path('add-new-dictionary/', login_required(AddDictionaryView.as_view()), name='add_dictionary'),
-    path('add-new-words/', login_required(AddPairWordView.as_view()), name='add_new_words'),
-    path('import-new-words/', login_required(ImportWordsView.as_view()), name='import_new_words'),
+    path('add-new-words/', login_required(read_from_replica(AddPairWordView.as_view())), name='add_new_words'),
+    path('import-new-words/', login_required(read_from_replica(ImportWordsView.as_view())), name='import_new_words'),
+    path('import-dictionaries/', login_required(ImportArchiveView.as_view()), name='import_archive'),
 
-    path('', ShowAllDictionaryUserView.as_view(), name='show_dictionaries'),
-    path('show-dictionary/<slug:dict_slug>', ShowDictionaryView.as_view(), name='show_dictionary'),
+    path('', read_from_replica(ShowAllDictionaryUserView.as_view()), name='show_dictionaries'),
+    path('search/', login_required(SearchWordsView.as_view()), name='search_words'),
+    path('search/duplicates/', login_required(DuplicateWordsView.as_view()), name='duplicate_words'),
+    path('search/autocomplete', login_required(autocomplete_words), name='autocomplete_words'),
+    path('show-dictionary/<slug:dict_slug>', read_from_replica(ShowDictionaryView.as_view()), name='show_dictionary'),
+    path('show-dictionary/<slug:dict_slug>/words', login_required(read_from_replica(dictionary_words)),
+         name='dictionary_words'),
+    path('show-dictionary/<slug:dict_slug>/export', login_required(export_words), name='export_dictionary'),
+    path('export/', login_required(export_words), name='export_words'),
     path('update-dictionary/<slug:dict_slug>', UpdateDictionaryView.as_view(), name='update_dictionary'),
-    path('delete-dictionary/<slug:dict_slug>', delete_dictionary, name='delete_dictionary'),
+    path('delete-dictionary/<slug:dict_slug>', login_required(delete_dictionary), name='delete_dictionary'),
+
+    path('jobs/<int:job_id>', login_required(JobView.as_view()), name='job'),
+    path('jobs/<int:job_id>/status', login_required(job_status), name='job_status'),
+    path('jobs/<int:job_id>/file', login_required(job_file), name='job_file'),
 
     path('study-words/<slug:dict_slug>', StudyWordsView.as_view(), name='study_words'),
+    path('study-words/<slug:dict_slug>/answer', check_answer, name='check_answer'),
     path('repeat-words/<slug:dict_slug>', RepeatWordsView.as_view(), name='repeat_words'),
 
     path('congratulations/', reset, name='congratulations'),
-    path('error-words/', show_error_words, name='error_words'),
+    path('error-words/', login_required(read_from_replica(show_error_words)), name='error_words'),
+    path('review-mistakes/', login_required(ReviewMistakesView.as_view()), name='review_mistakes'),
 ]
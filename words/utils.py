@@ -1,8 +1,15 @@
+import csv
+import hashlib
+import io
+import os
 import re
+import string
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Iterator
 
-from django.contrib import messages
-from django.shortcuts import redirect, render
-from django.urls import reverse
+from django.conf import settings
 
 cyrillic_to_latin = {
     'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y',
@@ -12,22 +19,249 @@ cyrillic_to_latin = {
 }
 
 
+SLUG_MAX_LENGTH = 80
+# при переименовании длинного заголовка основа слага укорачивается, чтобы поместился суффикс -N;
+# префикс запроса занятых слагов берётся с запасом на суффикс до 9 цифр
+SLUG_PREFIX_LENGTH = SLUG_MAX_LENGTH - 10
+SLUG_FALLBACK = 'dictionary'
+SLUG_TRANSLATION = str.maketrans(cyrillic_to_latin)
+SLUG_DISALLOWED_RE = re.compile(r"[^\w\s-]")
+SLUG_SEPARATOR_RE = re.compile(r"-{2,}| +")
+
+
 class Slug:
     def __init__(self, phrase: str):
-        self.phrase = self.clean_phrase(phrase)
-        self.slug = self.generate_slug()
-
-    def generate_slug(self):
-        return ''.join(cyrillic_to_latin.get(letter, letter) for letter in self.phrase)
+        self.slug = make_slug(phrase)
 
     @staticmethod
     def clean_phrase(phrase: str) -> str:
         if phrase and isinstance(phrase, str):
             phrase = phrase.lower().strip()
-            return re.sub(r"-{2,}| +", '-', re.sub(r"[^\w\s-]", "", phrase))
+            return SLUG_SEPARATOR_RE.sub('-', SLUG_DISALLOWED_RE.sub('', phrase))
         raise TypeError('The phrase must be a string!')
 
 
+@lru_cache(maxsize=4096)
+def make_slug(phrase: str) -> str:
+    """Слаг заголовка: транслитерация одной таблицей str.translate, результат кэшируется."""
+    return Slug.clean_phrase(phrase).translate(SLUG_TRANSLATION)
+
+
+def get_slug_base(title: str) -> str:
+    return make_slug(title)[:SLUG_MAX_LENGTH] or SLUG_FALLBACK
+
+
+def make_unique_slugs(bases: list[str], taken: set[str]) -> list[str]:
+    """
+    Уникальные слаги для основ bases (get_slug_base): занятая основа получает суффикс -2, -3, ...
+
+    taken - уже занятые слаги с теми же префиксами, обычно результат одного запроса
+    по SLUG_PREFIX_LENGTH; одинаковые основы внутри bases тоже получают разные суффиксы.
+    """
+    taken = set(taken)
+    next_suffixes = {}
+    slugs = []
+    for base in bases:
+        slug = base
+        suffix = next_suffixes.get(base, 2)
+        while slug in taken:
+            tail = f'-{suffix}'
+            slug = base[:SLUG_MAX_LENGTH - len(tail)] + tail
+            suffix += 1
+
+        next_suffixes[base] = suffix
+        taken.add(slug)
+        slugs.append(slug)
+
+    return slugs
+
+
+class SeededPermutation:
+    """
+    Детерминированная псевдослучайная перестановка чисел 0..size-1, задаваемая seed.
+
+    Перестановка не хранится: permutation[i] вычисляется сетью Фейстеля над ближайшей
+    степенью двойки, а значения за пределами size отбрасываются повторным шифрованием (cycle walking).
+    """
+    rounds = 4
+
+    def __init__(self, size: int, seed: int):
+        self.size = size
+        self.seed = seed
+        bits = max((size - 1).bit_length(), 2)
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError('permutation index out of range')
+
+        value = self.encrypt(index)
+        while value >= self.size:
+            value = self.encrypt(value)
+        return value
+
+    def encrypt(self, value: int) -> int:
+        left, right = value >> self.half_bits, value & self.half_mask
+        for round_number in range(self.rounds):
+            left, right = right, left ^ self.round_function(right, round_number)
+        return (left << self.half_bits) | right
+
+    def round_function(self, value: int, round_number: int) -> int:
+        digest = hashlib.blake2b(f'{self.seed}:{round_number}:{value}'.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') & self.half_mask
+
+
+WORD_KEY_MAX_LENGTH = 255
+
+
+def normalize_word(text: str, fold_diacritics: bool = False) -> str:
+    """NFKC, casefold и одиночные пробелы; с fold_diacritics ещё и без диакритических знаков (café -> cafe)."""
+    text = ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+    if fold_diacritics:
+        decomposed = unicodedata.normalize('NFD', text)
+        text = unicodedata.normalize('NFC', ''.join(char for char in decomposed if not unicodedata.combining(char)))
+    return text
+
+
+def make_word_key(original: str) -> str:
+    """
+    Ключ PairWord.original_key для поиска дубликатов.
+
+    Свёртка диакритики включается настройкой WORDS_FOLD_DIACRITICS: для русского она склеивает
+    разные буквы (й и и), поэтому по умолчанию выключена. После её изменения ключи
+    пересчитываются командой rebuild_word_keys.
+    """
+    return normalize_word(original, settings.WORDS_FOLD_DIACRITICS)[:WORD_KEY_MAX_LENGTH]
+
+
+def get_prefix_upper_bound(prefix: str) -> str | None:
+    """
+    Наименьшая строка, которая больше всех строк, начинающихся с prefix (по кодам символов).
+
+    Returns:
+        str | None: Верхняя граница или None, если prefix состоит только из максимальных символов.
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        # суррогаты не кодируются в UTF-8, следующий допустимый символ идёт после них
+        code = 0xE000
+    return prefix[:-1] + chr(code)
+
+
+MATCH_EXACT = 'exact'
+MATCH_NEAR = 'near'
+MATCH_WRONG = 'wrong'
+ANSWER_ARTICLES = ('a ', 'an ', 'the ')
+
+
+def normalize_answer(text: str) -> str:
+    """Приводит ответ к виду для сравнения: NFKC, casefold, одиночные пробелы, без пунктуации и артикля в начале."""
+    text = normalize_word(text).strip(string.punctuation + ' ')
+    for article in ANSWER_ARTICLES:
+        if text.startswith(article):
+            return text[len(article):]
+    return text
+
+
+def get_answer_alternatives(original: str) -> list[str]:
+    """
+    Возвращает нормализованные варианты правильного ответа.
+
+    Оригинал, записанный через "," или ";", даёт несколько вариантов, каждый из которых засчитывается,
+    как и вся строка целиком.
+    """
+    alternatives = [normalize_answer(original)]
+    alternatives.extend(normalize_answer(part) for part in re.split(r'[,;]', original))
+    return list(dict.fromkeys(alternative for alternative in alternatives if alternative))
+
+
+def get_max_edits(length: int) -> int:
+    if length <= 3:
+        return 0
+    if length <= 7:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(source: str, target: str, limit: int) -> int:
+    """
+    Расстояние Левенштейна, если оно не больше limit, иначе limit + 1.
+
+    Считается только полоса шириной 2 * limit + 1 вокруг диагонали, а вычисление прекращается,
+    как только вся строка матрицы превысила limit, поэтому сложность O(len * limit).
+    """
+    if abs(len(source) - len(target)) > limit:
+        return limit + 1
+    if len(source) > len(target):
+        source, target = target, source
+
+    over_limit = limit + 1
+    previous = [min(j, over_limit) for j in range(len(target) + 1)]
+    for i, source_char in enumerate(source, 1):
+        current = [min(i, over_limit)] + [over_limit] * len(target)
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(target), i + limit) + 1):
+            value = min(
+                previous[j - 1] + (source_char != target[j - 1]),
+                previous[j] + 1,
+                current[j - 1] + 1,
+                over_limit,
+            )
+            current[j] = value
+            row_min = min(row_min, value)
+
+        if row_min > limit:
+            return over_limit
+        previous = current
+
+    return previous[-1]
+
+
+def match_answer(user_answer: str, alternatives: list[str]) -> str:
+    """
+    Сравнивает ответ с вариантами из get_answer_alternatives.
+
+    Returns:
+        str: MATCH_EXACT, MATCH_NEAR (опечатка в пределах get_max_edits) или MATCH_WRONG.
+    """
+    answer = normalize_answer(user_answer)
+    if not answer:
+        return MATCH_WRONG
+    if answer in alternatives:
+        return MATCH_EXACT
+
+    for alternative in alternatives:
+        limit = get_max_edits(len(alternative))
+        if limit and bounded_edit_distance(answer, alternative, limit) <= limit:
+            return MATCH_NEAR
+
+    return MATCH_WRONG
+
+
+IMAGES_DIRECTORY = 'dictionaries_images'
+IMAGE_RENDITIONS = {'thumb': (320, 200), 'large': (960, 600)}
+IMAGE_RENDITION_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+
+def get_image_name(image_hash: str, extension: str, rendition: str | None = None) -> str:
+    """
+    Путь картинки словаря в хранилище, адресованный хэшем её содержимого.
+
+    Одинаковые загрузки получают один и тот же путь, а файл по этому пути никогда не меняется,
+    поэтому его можно кэшировать навсегда.
+    """
+    suffix = f'_{rendition}' if rendition else ''
+    return f'{IMAGES_DIRECTORY}/{image_hash[:2]}/{image_hash}{suffix}{extension}'
+
+
 def get_sep(form):
     if not form.cleaned_data.get('custom_sep'):
         return form.cleaned_data.get('sep_choice')
@@ -35,42 +269,104 @@ def get_sep(form):
     return form.cleaned_data.get('custom_sep')
 
 
-def get_existing_originals(db_words) -> set[str]:
-    return set(pair.original for pair in db_words)
+def clean_pair(original: str, translation: str) -> tuple[str, str] | None:
+    original, translation = original.lower().strip(), translation.lower().strip()
+    if not original or not translation:
+        return None
+
+    return original, translation
+
+
+def split_pair(line: str, sep: str) -> tuple[str, str] | None:
+    """
+    Разбивает строку импорта на пару (оригинал, перевод).
+
+    Returns:
+        tuple | None: Нормализованная пара или None, если строку нельзя разобрать.
+    """
+    parts = line.strip().split(sep)
+    if len(parts) != 2:
+        return None
+
+    return clean_pair(*parts)
+
 
+IMPORT_FILE_SEPARATORS = {'.csv': ',', '.tsv': '\t'}
 
-def get_unique_pairs(text: str, existing_originals: set[str], sep, dictionary, PairWord):
-    unique_pairs = []
-    for pair in text.split('\n'):
+
+def parse_import_lines(lines: Iterable[str], extension: str, sep: str) -> Iterator[tuple[str, str] | None]:
+    """Пары из строк файла импорта: .csv и .tsv читаются модулем csv, остальные делятся разделителем sep."""
+    if extension not in IMPORT_FILE_SEPARATORS:
+        for line in lines:
+            if line.strip():
+                yield split_pair(line, sep)
+        return
+
+    reader = csv.reader(lines, delimiter=IMPORT_FILE_SEPARATORS[extension])
+    while True:
         try:
-            original, translation = pair.lower().strip().split(sep)
-            if original not in existing_originals:
-                unique_pairs.append(PairWord(original=original, translation=translation, dictionary=dictionary))
-        except ValueError:
-            unique_pairs.append(PairWord(original=pair.lower().strip(), translation='', dictionary=dictionary))
-    return unique_pairs
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            yield None
+            continue
+
+        if any(cell.strip() for cell in row):
+            yield clean_pair(*row) if len(row) == 2 else None
 
 
-def get_delete_and_updated_words(formset, PairWord, dictionary):
+def parse_import_file(name: str, data: bytes, sep: str) -> list[tuple[str, str] | None]:
+    """
+    Разбирает содержимое файла импорта целиком.
+
+    Функция не обращается к базе и моделям, поэтому её можно выполнять в отдельном процессе.
+    """
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig', errors='replace', newline='')
+    return list(parse_import_lines(lines, os.path.splitext(name)[1].lower(), sep))
+
+
+def parse_word_changes(data) -> dict[int, dict]:
+    """
+    Собирает изменённые слова из POST-данных редактора словаря.
+
+    Редактор отправляет только изменённые и удаляемые строки в полях вида word-<id>-<field>.
+
+    Returns:
+        dict: {id слова: {'original': ..., 'translation': ..., 'delete': ...}}
+    """
+    changes = {}
+    for key, value in data.items():
+        match = re.fullmatch(r'word-(?P<id>\d+)-(?P<field>original|translation|delete)', key)
+        if match:
+            changes.setdefault(int(match['id']), {})[match['field']] = value
+
+    return changes
+
+
+def get_delete_and_updated_words(changed_words: dict[int, dict], existing_words: dict[int, tuple[str, str]],
+                                 PairWord, dictionary):
     words_to_delete = []
     updated_words = []
 
-    for cleaned_data in formset.cleaned_data:
+    for word_id, cleaned_data in changed_words.items():
+        if word_id not in existing_words:
+            continue
+
         delete_word = cleaned_data.get('delete')
         new_original = cleaned_data.get('original')
         new_translation = cleaned_data.get('translation')
-        old_original = cleaned_data.get('id').original
-        old_translation = cleaned_data.get('id').translation
+        old_original, old_translation = existing_words[word_id]
 
         if delete_word:
-            words_to_delete.append(cleaned_data.get('id').id)
+            words_to_delete.append(word_id)
 
-        elif delete_word is False and (new_original != old_original or new_translation != old_translation):
+        elif new_original != old_original or new_translation != old_translation:
 
             updated_word = PairWord(
-                id=cleaned_data.get('id').id,
-                original=cleaned_data.get('original'),
-                translation=cleaned_data.get('translation'),
+                id=word_id,
+                original=new_original,
+                translation=new_translation,
                 dictionary=dictionary
             )
             updated_words.append(updated_word)
@@ -121,103 +417,3 @@ def set_data_session(request, **kwargs):
     """
     for key, value in kwargs.items():
         request.session[key] = value
-
-
-def study_process(request, **kwargs):
-    """
-    Обрабатывает процесс обучения пользователя словам из словаря.
-
-    Args:
-        request (HttpRequest): Запрос от клиента.
-        **kwargs: Дополнительные параметры и объекты, необходимые для выполнения функции.
-
-            Следующие константы и объекты должны быть переданы в kwargs:
-
-            - STOP_LEARNING (int): Уровень, на котором обучение завершается.
-            - NEXT_LEVEL_POINT (int): Количество баллов для перехода на следующий уровень.
-            - START_INDEX: Индекс начала текущего среза слов. (Значение по умолчанию)
-            - END_INDEX: Индекс конца текущего среза слов. (Значение по умолчанию)
-            - STEP_INDEX (int): Шаг для увелечения end_index. (Значение по умолчанию)
-            - POINT (int): Начальное количество балов. (Значение по умолчанию)
-            - template_name (str): Имя шаблона, используемого для отображения страницы.
-            - dict_slug (str): Слаг словаря, с которым работает пользователь.
-
-            Дополнительные модели:
-
-            - PairWord (model): Модель для работы с парами слов.
-            - RepeatWordForm (form): Форма для ответа пользователя на слово.
-
-            Следующие аргументы могут быть извлечены из данных сессии:
-
-            - start_index (int): Индекс начала текущего среза слов.
-            - end_index (int): Индекс конца текущего среза слов.
-            - level (int): Текущий уровень обучения.
-            - current_word_index (int): Индекс текущего изучаемого слова.
-            - study_words (list): Список изучаемых слов с баллами.
-
-    Returns:
-        HttpResponse: HTTP-ответ с результатом обработки запроса.
-
-    """
-
-    data = get_data_session(request,
-                            **{'start_index': kwargs['START_INDEX'],
-                               'end_index': kwargs['END_INDEX'],
-                               'level': 1,
-                               'current_word_index': 0,
-                               'study_words': []
-                               })
-
-    start_index = data.get('start_index', 1)
-    end_index = data['end_index']
-    level = request.session.get('level', 1)
-    current_word_index = data['current_word_index']
-    study_words = data['study_words']
-
-    if level < kwargs['STOP_LEARNING']:
-        if study_words:
-            # проверяем количество балов у пар
-            study_words = [{'pair': word['pair'], 'point': word['point']}
-                           for word in study_words if word['point'] < kwargs['NEXT_LEVEL_POINT']]
-
-        if not study_words:
-            db_words = kwargs['PairWord'].objects.filter(dictionary__slug=kwargs['dict_slug']).order_by('id')
-            if start_index > len(db_words) - 1:
-                # если список слов закончился
-                level += 1
-                start_index, end_index = 0, 5
-
-            study_words = [{'pair': (pair.original, pair.translation), 'point': 0}
-                           for pair in db_words[start_index:end_index]]
-            set_data_session(request, level=level, start_index=end_index,
-                             end_index=end_index + kwargs['STEP_INDEX'])
-
-        if current_word_index + 1 > len(study_words):
-            current_word_index = 0
-
-        set_data_session(request, study_words=study_words, current_word_index=current_word_index)
-
-        title = ' '.join(kwargs["dict_slug"].split('-')).title()
-        form = kwargs['RepeatWordForm']()
-        reset_url = reverse('words:study_words', kwargs={'dict_slug': kwargs["dict_slug"]})
-        context = {'translation': study_words[current_word_index]['pair'][1],
-                   'title': f'Study {title}',
-                   'form': form,
-                   'slug': kwargs['dict_slug'],
-                   'reset_url': reset_url,
-                   }
-        return render(request, kwargs['template_name'], context)
-    else:
-        data_reset = {
-            'level': kwargs['LEVEL'],
-            'original': None,
-            'translation': None,
-            'study_words': None,
-            'start_index': kwargs['START_INDEX'],
-            'end_index': kwargs['END_INDEX'],
-            'step': kwargs['STEP_INDEX'],
-            'point': kwargs['POINT'],
-            'current_word_index': kwargs['CURRENT_WORD_INDEX']
-        }
-        set_data_session(request, **data_reset)
-    return redirect(reverse('words:repeat_words', kwargs={'dict_slug': kwargs['dict_slug']}))
@@ -1,21 +1,53 @@
-from random import shuffle
+import os
+import uuid
+from random import getrandbits
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.contrib.auth import get_user
 from django.contrib.messages.views import SuccessMessageMixin
-from django.db.models import Count
-from django.forms import inlineformset_factory
-from django.http import HttpResponseRedirect
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import (FileResponse, Http404, HttpResponseBadRequest,
+                         HttpResponseNotAllowed, HttpResponseRedirect,
+                         JsonResponse, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
-from django.views.generic import CreateView, DetailView, ListView, UpdateView
+from django.utils.dateparse import parse_datetime
+from django.views.generic import (CreateView, DetailView, FormView, ListView,
+                                  UpdateView)
 
 from common.views import DataMixin
 
-from .forms import (AddDictionaryForm, AddPairWordForm, ImportWordsForm,
-                    PairWordForm, RepeatWordForm)
-from .models import Dictionary, PairWord, UserLearningData
-from .utils import (Slug, get_delete_and_updated_words, get_existing_originals,
-                    get_sep, get_unique_pairs)
+from . import jobs
+from .forms import (AddDictionaryForm, AddPairWordForm, ExportWordsForm,
+                    ImportArchiveForm, ImportWordsForm, PairWordForm,
+                    RepeatWordForm)
+from .models import Dictionary, Job, PairWord, UserLearningData
+from .services.answer_check_service import AnswerCheckService
+from .services.custom_messages_service import CustomMessagesService
+from .services.dictionary_cache_service import DictionaryCacheService
+from .services.dictionary_image_service import DictionaryImageService
+from .services.export_words_service import ExportWordsService
+from .services.import_words_service import ImportWordsService
+from .services.job_service import JobService
+from .services.session_service import LearningDataConflictError, SessionService
+from .services.study_state_service import RepeatStateService, StudyStateService
+from .services.study_words_service import StudyWordsService
+from .services.word_search_service import WordSearchService
+from .services.word_statistics_service import WordStatisticsService
+from .utils import (MATCH_WRONG, SeededPermutation, clean_pair,
+                    get_answer_alternatives, get_delete_and_updated_words,
+                    get_sep, match_answer, parse_word_changes)
+
+WORDS_PAGE_SIZE = 50
+MAX_WORDS_PAGE_SIZE = 200
+ERROR_WORDS_LIMIT = 50
+SEARCH_RESULTS_LIMIT = 50
+DUPLICATE_WORDS_LIMIT = 100
+AUTOCOMPLETE_LIMIT = 10
 
 
 class AddDictionaryView(DataMixin, SuccessMessageMixin, CreateView):
@@ -26,16 +58,18 @@ class AddDictionaryView(DataMixin, SuccessMessageMixin, CreateView):
     def form_valid(self, form):
         user = self.request.user
 
-        slug = Slug(form.cleaned_data['title']).slug
-        existing_dictionary = Dictionary.objects.filter(user=user, slug=slug).first()
-        if existing_dictionary:
-            messages.error(self.request, 'Dictionary with this name already exists.')
-            return redirect(reverse('words:add_dictionary'))
-
+        # одинаковые заголовки разрешены: Dictionary.save подбирает свободный слаг с суффиксом
         dictionary = form.save(commit=False)
         dictionary.user = user
 
+        image_service = None
+        if form.cleaned_data.get('image'):
+            image_service = DictionaryImageService.save_upload(dictionary, form.cleaned_data['image'])
+
         dictionary.save()
+        if image_service and not dictionary.image_ready:
+            JobService.enqueue(user, jobs.DICTIONARY_IMAGE,
+                               image_hash=image_service.image_hash, extension=image_service.extension)
 
         return HttpResponseRedirect(reverse('words:add_new_words'))
 
@@ -52,13 +86,16 @@ class AddPairWordView(DataMixin, CreateView):
         original_words = form.data.getlist('original_word')
         translation_words = form.data.getlist('translation_word')
 
-        pair_objects = []
-        for original, translation in zip(original_words, translation_words):
-            original, translation = original.strip().lower(), translation.strip().lower()
-            pair_objects.append(PairWord(original=original, translation=translation, dictionary=dictionary))
+        # та же запись, что и при импорте: дубликаты по original_key пропускаются, а не роняют запрос
+        import_service = ImportWordsService(dictionary, sep='')
+        import_service.import_pairs(clean_pair(original, translation)
+                                    for original, translation in zip(original_words, translation_words))
 
-        PairWord.objects.bulk_create(pair_objects)
-        dictionary.save()
+        if import_service.inserted:
+            DictionaryCacheService(dictionary.id).invalidate()
+            dictionary.save()
+
+        messages.success(self.request, f'Words saved: {import_service}')
 
         return HttpResponseRedirect(reverse('words:show_dictionary', kwargs={'dict_slug': dictionary.slug}))
 
@@ -75,22 +112,25 @@ class ImportWordsView(DataMixin, CreateView):
     title = 'Import New Pairs Words'
 
     def form_valid(self, form):
+        """Сохраняет файл или текст во временное хранилище и ставит импорт в очередь фоновых задач."""
         id_dictionary = form.data.get('dictionary')
-        dictionary = Dictionary.objects.get(id=id_dictionary)
-
-        text = form.cleaned_data.get('text')
+        dictionary = Dictionary.objects.get(id=id_dictionary, user=self.request.user)
 
-        if text:
-            sep = get_sep(form)
-            db_words = PairWord.objects.filter(dictionary_id=id_dictionary)
-            existing_originals = get_existing_originals(db_words)
-            words_for_db = get_unique_pairs(text, existing_originals, sep, dictionary, PairWord)
+        uploaded_file = form.cleaned_data.get('file')
+        if uploaded_file:
+            extension = os.path.splitext(uploaded_file.name)[1].lower() or '.txt'
+        else:
+            extension = '.txt'
+            uploaded_file = ContentFile(form.cleaned_data.get('text').encode())
 
-            if words_for_db:
-                PairWord.objects.bulk_create(words_for_db)
-                dictionary.save()
+        name = default_storage.save(f'{jobs.JOB_FILES_DIRECTORY}/{uuid.uuid4().hex}{extension}', uploaded_file)
+        job = JobService.enqueue(
+            self.request.user, jobs.IMPORT_WORDS,
+            dictionary_id=dictionary.id, file=name, sep=get_sep(form),
+            on_conflict=form.cleaned_data.get('on_conflict'),
+        )
 
-        return HttpResponseRedirect(reverse('words:show_dictionary', kwargs={'dict_slug': dictionary.slug}))
+        return redirect('words:job', job_id=job.pk)
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -99,15 +139,97 @@ class ImportWordsView(DataMixin, CreateView):
         return kwargs
 
 
+class ImportArchiveView(DataMixin, FormView):
+    form_class = ImportArchiveForm
+    template_name = 'words/import_archive.html'
+    title = 'Import Dictionaries'
+
+    def form_valid(self, form):
+        name = default_storage.save(f'{jobs.JOB_FILES_DIRECTORY}/{uuid.uuid4().hex}.zip', form.cleaned_data['archive'])
+        job = JobService.enqueue(self.request.user, jobs.IMPORT_ARCHIVE, file=name, sep=get_sep(form),
+                                 on_conflict=form.cleaned_data['on_conflict'])
+
+        return redirect('words:job', job_id=job.pk)
+
+
 class ShowAllDictionaryUserView(DataMixin, ListView):
     model = Dictionary
     template_name = 'words/show_all_dictionaries_user.html'
     title = 'Home'
+    page_size = 24
 
     def get_queryset(self):
-        dictionaries = Dictionary.objects.filter(user_id=self.request.user.pk).order_by('-updated_at')
-        dictionaries = dictionaries.annotate(count_words=Count('pairword'))
-        return dictionaries
+        """
+        Keyset-пагинация по (updated_at, id): курсор - значения последнего словаря предыдущей страницы,
+        поэтому запрос читает только page_size + 1 строк независимо от номера страницы.
+        """
+        dictionaries = Dictionary.objects.filter(user_id=self.request.user.pk, word_count__gt=0)
+
+        cursor = self.get_cursor()
+        if cursor:
+            updated_at, dictionary_id = cursor
+            dictionaries = dictionaries.filter(
+                Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=dictionary_id)
+            )
+
+        return dictionaries.order_by('-updated_at', '-id')[:self.page_size + 1]
+
+    def get_cursor(self):
+        updated_at, _, dictionary_id = self.request.GET.get('cursor', '').rpartition('_')
+        try:
+            updated_at = parse_datetime(updated_at)
+            dictionary_id = int(dictionary_id)
+        except ValueError:
+            return None
+
+        if updated_at is None:
+            return None
+        return updated_at, dictionary_id
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        dictionaries = list(context['dictionary_list'])
+
+        context['next_cursor'] = None
+        if len(dictionaries) > self.page_size:
+            dictionaries = dictionaries[:self.page_size]
+            last = dictionaries[-1]
+            context['next_cursor'] = f'{last.updated_at.isoformat()}_{last.id}'
+
+        context['dictionary_list'] = context['object_list'] = dictionaries
+        context['is_first_page'] = not self.request.GET.get('cursor')
+        return context
+
+
+class SearchWordsView(DataMixin, ListView):
+    template_name = 'words/search_words.html'
+    context_object_name = 'words'
+    title = 'Search'
+
+    def get_queryset(self):
+        return WordSearchService(self.request.user).search(self.request.GET.get('q', ''), SEARCH_RESULTS_LIMIT)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        context['min_query_length'] = WordSearchService.min_query_length
+        return context
+
+
+class DuplicateWordsView(DataMixin, ListView):
+    """Слова, которые встречаются в нескольких словарях пользователя (совпадение по original_key)."""
+    template_name = 'words/duplicate_words.html'
+    context_object_name = 'duplicates'
+    title = 'Duplicate Words'
+
+    def get_queryset(self):
+        return WordSearchService(self.request.user).get_duplicates(DUPLICATE_WORDS_LIMIT)
+
+
+def autocomplete_words(request):
+    """Подсказки для поля оригинала при добавлении слов: слова из всех словарей пользователя по префиксу."""
+    words = WordSearchService(request.user).autocomplete(request.GET.get('q', ''), AUTOCOMPLETE_LIMIT)
+    return JsonResponse({'words': words})
 
 
 class ShowDictionaryView(DetailView):
@@ -119,104 +241,246 @@ class ShowDictionaryView(DetailView):
         context = super().get_context_data(**kwargs)
         context['dict_slug'] = self.kwargs['dict_slug']
         context['title'] = self.object.title
-        word_list = PairWord.objects.filter(dictionary=self.object).select_related('dictionary').order_by('-id')
-
-        context['word_list'] = word_list
-        context['word_data'] = [{'original': word.original, 'translation': word.translation} for word in word_list]
+        context['count_words'] = self.object.word_count
+        context['words_url'] = reverse('words:dictionary_words', kwargs={'dict_slug': self.object.slug})
+        context['export_form'] = ExportWordsForm()
         return context
 
     def get_queryset(self):
-        dictionary = Dictionary.objects.filter(user_id=self.request.user.pk, slug=self.kwargs[self.slug_url_kwarg])
-        dictionary = dictionary.annotate(count_words=Count('pairword'))
+        return Dictionary.objects.filter(user_id=self.request.user.pk, slug=self.kwargs[self.slug_url_kwarg])
+
+
+def dictionary_words(request, dict_slug):
+    """
+    Отдаёт слова словаря страницами в JSON, от новых к старым.
+
+    Пагинация курсорная: cursor - id последнего полученного слова, следующая страница
+    выбирается условием id < cursor, поэтому стоимость запроса не зависит от номера страницы.
+    """
+    dictionary = get_object_or_404(Dictionary, slug=dict_slug, user=request.user)
+
+    try:
+        cursor = int(request.GET['cursor']) if request.GET.get('cursor') else None
+        limit = max(1, min(int(request.GET.get('limit', WORDS_PAGE_SIZE)), MAX_WORDS_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'cursor and limit must be integers'}, status=400)
+
+    words = PairWord.objects.filter(dictionary=dictionary).order_by('-id')
+    if cursor is not None:
+        words = words.filter(id__lt=cursor)
+    words = list(words.values('id', 'original', 'translation')[:limit + 1])
+
+    next_cursor = None
+    if len(words) > limit:
+        words = words[:limit]
+        next_cursor = words[-1]['id']
+
+    return JsonResponse({'words': words, 'next_cursor': next_cursor})
+
+
+def export_words(request, dict_slug=None):
+    """Выгружает словарь dict_slug или, без него, все словари пользователя в виде потокового файла."""
+    form = ExportWordsForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest('unknown export format or separator')
 
-        return dictionary
+    dictionaries = Dictionary.objects.filter(user=request.user).order_by('title', 'id')
+    if dict_slug:
+        dictionaries = [get_object_or_404(dictionaries, slug=dict_slug)]
+
+    export_format = form.cleaned_data['export_format'] or ExportWordsService.TEXT
+    sep = get_sep(form) or ' - '
+    if form.cleaned_data['background']:
+        job = JobService.enqueue(request.user, jobs.EXPORT_WORDS, export_format=export_format, sep=sep,
+                                 compress=form.cleaned_data['compress'], dict_slug=dict_slug)
+        return redirect('words:job', job_id=job.pk)
+
+    export_service = ExportWordsService(dictionaries, export_format, sep, form.cleaned_data['compress'])
+    response = StreamingHttpResponse(export_service, content_type=export_service.get_content_type())
+    filename = export_service.get_filename(dict_slug or 'dictionaries')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    return response
 
 
 class UpdateDictionaryView(SuccessMessageMixin, UpdateView):
+    """
+    Постраничный редактор словаря.
+
+    Страница показывает page_size слов (keyset-пагинация по id), а браузер отправляет
+    только изменённые и удаляемые строки, поэтому стоимость сохранения зависит
+    от количества правок, а не от размера словаря.
+    """
     model = Dictionary
     template_name = 'words/update_dictionary.html'
     slug_url_kwarg = 'dict_slug'
     context_object_name = 'dictionary'
     fields = ['title']
+    page_size = 100
+    update_batch_size = 500
 
     def get_queryset(self):
         return Dictionary.objects.filter(slug=self.kwargs['dict_slug'], user=self.request.user)
 
+    def get_cursor(self):
+        cursor = self.request.GET.get('cursor')
+        return int(cursor) if cursor and cursor.isdigit() else None
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         dictionary = self.object
-        words_to_change = PairWord.objects.filter(dictionary=dictionary).order_by('-id')
+        cursor = self.get_cursor()
+
+        words = PairWord.objects.filter(dictionary=dictionary).order_by('-id')
+        if cursor:
+            words = words.filter(id__lt=cursor)
+        words = list(words.values_list('id', 'original', 'translation')[:self.page_size + 1])
+
         context['title'] = dictionary.title
-        context['count_words'] = words_to_change.count()
-        PairWordFormSet = inlineformset_factory(Dictionary, PairWord, form=PairWordForm, extra=0)
-        context['formset'] = PairWordFormSet(instance=dictionary, queryset=words_to_change)
+        context['count_words'] = dictionary.word_count
+        context['words'] = words[:self.page_size]
+        context['cursor'] = cursor
+        context['next_cursor'] = words[self.page_size - 1][0] if len(words) > self.page_size else None
 
         return context
 
     def post(self, request, *args, **kwargs):
         changed_title = self.request.POST.get('title').strip()
-        slug = Slug(changed_title).slug
 
         dictionary = self.get_object()
-        words_to_change = PairWord.objects.filter(dictionary=dictionary)
-        PairWordFormSet = inlineformset_factory(Dictionary, PairWord, form=PairWordForm, extra=0)
-        formset = PairWordFormSet(request.POST, instance=dictionary, queryset=words_to_change)
-
-        if formset.is_valid():
-            words_to_delete, updated_words = get_delete_and_updated_words(formset, PairWord, dictionary)
-
-            if words_to_delete:
-                # Выполняем удаление слов
-                PairWord.objects.filter(id__in=words_to_delete).delete()
+        changes = parse_word_changes(request.POST)
+        existing_words = {
+            word_id: (original, translation)
+            for word_id, original, translation in PairWord.objects.filter(dictionary=dictionary, id__in=changes)
+            .values_list('id', 'original', 'translation')
+        }
 
-            if updated_words:
-                PairWord.objects.bulk_update(updated_words, ['original', 'translation'])
+        changed_words = {}
+        for word_id, data in changes.items():
+            form = PairWordForm(data=data)
+            if not form.is_valid():
+                messages.error(request, 'the changes were not saved: original and translation are required, '
+                                        'up to 150 characters')
+                return self.redirect_to_page(kwargs['dict_slug'])
+            changed_words[word_id] = form.cleaned_data
+
+        words_to_delete, updated_words = get_delete_and_updated_words(
+            changed_words, existing_words, PairWord, dictionary
+        )
+
+        try:
+            with transaction.atomic():
+                if words_to_delete:
+                    # Выполняем удаление слов
+                    _, deleted = PairWord.objects.filter(id__in=words_to_delete, dictionary=dictionary).delete()
+                    dictionary.update_word_count(-deleted.get(PairWord._meta.label, 0))
+
+                if updated_words:
+                    PairWord.objects.bulk_update(
+                        updated_words, ['original', 'translation'], batch_size=self.update_batch_size
+                    )
+        except IntegrityError:
+            messages.error(request, 'the changes were not saved: the dictionary already has such a word')
+            return self.redirect_to_page(kwargs['dict_slug'])
+
+        if words_to_delete or updated_words:
+            DictionaryCacheService(dictionary.id).invalidate()
+
+        if changed_title:
+            dictionary.title = changed_title
 
-            if kwargs['dict_slug'] != slug:
-                dictionary.title = changed_title
+        dictionary.save()
+        messages.success(request, f'the {dictionary.title} has been changed')
+        return self.redirect_to_page(dictionary.slug)
 
-            dictionary.save()
-            messages.success(request, f'the {dictionary.title} has been changed')
-        return redirect('words:update_dictionary', dict_slug=slug)
+    def redirect_to_page(self, dict_slug):
+        url = reverse('words:update_dictionary', kwargs={'dict_slug': dict_slug})
+        cursor = self.request.POST.get('cursor')
+        if cursor and cursor.isdigit():
+            url = f'{url}?cursor={cursor}'
+        return redirect(url)
 
 
 def delete_dictionary(request, dict_slug):
+    """Удаление словаря выполняется фоновой задачей: каскад по словам большого словаря слишком долгий для запроса."""
     dictionary = get_object_or_404(Dictionary, slug=dict_slug, user=request.user)
-    if dictionary:
-        dictionary.delete()
+    job = JobService.enqueue(request.user, jobs.DELETE_DICTIONARY, dictionary_id=dictionary.id)
 
-        return redirect('words:show_dictionaries')
+    return redirect('words:job', job_id=job.pk)
+
+
+class JobView(DataMixin, DetailView):
+    """Страница фоновой задачи: прогресс обновляется опросом job_status, по завершении показывается результат."""
+    template_name = 'words/job.html'
+    pk_url_kwarg = 'job_id'
+    context_object_name = 'job'
+    title = 'Background Task'
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+
+def job_status(request, job_id):
+    job = get_object_or_404(Job, pk=job_id, user=request.user)
+
+    return JsonResponse({
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'result': job.result,
+        'error': job.error,
+    })
+
+
+def job_file(request, job_id):
+    job = get_object_or_404(Job, pk=job_id, user=request.user, status=Job.DONE)
+    name = (job.result or {}).get('file')
+    if not name or not default_storage.exists(name):
+        raise Http404('the file of this task no longer exists')
+
+    return FileResponse(default_storage.open(name), as_attachment=True, filename=job.result.get('filename'))
 
 
 class RepeatWordsView(SuccessMessageMixin, DetailView):
+    """
+    Повторение всего словаря в случайном порядке.
+
+    Хранится только состояние {dict_slug, dictionary_id, seed, position, count} (RepeatStateService):
+    порядок слов вычисляется из seed через SeededPermutation, а текущая пара читается по id, поэтому
+    размер состояния и стоимость каждого ответа не зависят от размера словаря.
+    """
     model = Dictionary
     template_name = 'words/study_words.html'
     slug_url_kwarg = 'dict_slug'
+    session_key = 'repeat'
+
+    def get_title(self, **kwargs):
+        return 'Repeat ' + ' '.join(kwargs["dict_slug"].split('-')).title()
 
     def get_context(self, **kwargs):
-        title = ' '.join(kwargs["dict_slug"].split('-')).title()
         form = RepeatWordForm()
         reset_url = kwargs.get('reset_url')
-        current_word_index = kwargs['request'].session.get('current_word_index') or 0
+        repeat = self.repeat
+        position = repeat['position']
         custom_messages = {
             'translation': kwargs['translation'],
             'original': kwargs['original'],
         }
 
         if kwargs.get('user_answer'):
-            custom_messages['error_answer'] = kwargs['user_answer'] != kwargs.get('original')
+            match = match_answer(kwargs['user_answer'], get_answer_alternatives(kwargs['original']))
+            correct = match != MATCH_WRONG
+            custom_messages['error_answer'] = not correct
+            custom_messages['match'] = match
             custom_messages['user_answer'] = kwargs.get('user_answer')
-            kwargs['request'].session['current_word_index'] = current_word_index + 1
-
-            if kwargs['user_answer'] != kwargs.get('original'):
-                error_words = kwargs['request'].session.get('error_words') or list()
-                error_words.append((kwargs['original'], kwargs['translation']))
-                kwargs['request'].session['error_words'] = error_words
-        length = kwargs["request"].session.get("words")
-        if length:
-            length = len(length)
+            repeat['position'] = position + 1
+            self.get_repeat_state(kwargs['request']).set(repeat)
+            WordStatisticsService(kwargs['request'].user).record_answer(kwargs['word_id'], correct)
+
         context = {
-            'title': f'Repeat {title} | {current_word_index + 1}/{length}',
+            'title': f'{self.get_title(**kwargs)} | {position + 1}/{repeat["count"]}',
             'form': form,
             'reset_url': reset_url,
             'custom_messages': custom_messages,
@@ -224,28 +488,45 @@ class RepeatWordsView(SuccessMessageMixin, DetailView):
 
         return context
 
-    @staticmethod
-    def check_dict_session(request, **kwargs):
-        if kwargs['dict_slug'] != request.session.get('dict_session'):
-            request.session['dict_session'] = kwargs['dict_slug']
+    def get_repeat_state(self, request) -> RepeatStateService:
+        return RepeatStateService(request.user.pk, self.session_key)
+
+    def get_repeat_session(self, request, **kwargs):
+        repeat = self.get_repeat_state(request).get()
+        if not repeat or repeat['dict_slug'] != kwargs['dict_slug']:
+            dictionary = get_object_or_404(Dictionary, slug=kwargs['dict_slug'], user=request.user)
+            repeat = {
+                'dict_slug': kwargs['dict_slug'],
+                'dictionary_id': dictionary.id,
+                'seed': getrandbits(32),
+                'position': 0,
+                'count': dictionary.word_count,
+            }
+            self.get_repeat_state(request).set(repeat)
+
+        return repeat
+
+    def make_word_id_getter(self, repeat):
+        permutation = SeededPermutation(repeat['count'], repeat['seed'])
+        dictionary_cache = DictionaryCacheService(repeat['dictionary_id'])
+        return lambda position: dictionary_cache.get_word_id(permutation[position])
 
     def get_pair(self, request, **kwargs):
-        self.check_dict_session(request, **kwargs)
-
-        words = request.session.get('words')
-        current_word_index = request.session.get('current_word_index') or 0
-
-        if words is None:
-            request.session['error_words'] = None
-            words = PairWord.objects.filter(dictionary__slug=kwargs['dict_slug'])
-            words = [(pair.original, pair.translation) for pair in words]
-            shuffle(words)
+        repeat = self.repeat = self.get_repeat_session(request, **kwargs)
+        get_word_id = self.make_word_id_getter(repeat)
+
+        # слова, удалённые во время повторения, пропускаются
+        while repeat['position'] < repeat['count']:
+            pair = (
+                PairWord.objects.filter(pk=get_word_id(repeat['position']), dictionary__user=request.user)
+                .values_list('id', 'original', 'translation')
+                .first()
+            )
+            if pair:
+                return pair
 
-        if current_word_index < len(words) - 1:
-            original = words[current_word_index][0]
-            translation = words[current_word_index][1]
-            request.session['words'] = words
-            return original, translation
+            repeat['position'] += 1
+            self.get_repeat_state(request).set(repeat)
 
     def get(self, request, *args, **kwargs):
         pair = self.get_pair(request, **kwargs)
@@ -254,16 +535,16 @@ class RepeatWordsView(SuccessMessageMixin, DetailView):
             context = self.get_context(
                 **{
                     'request': request,
-                    'dict_slug': kwargs["dict_slug"],
-                    'translation': pair[1],
-                    'original': pair[0],
+                    'dict_slug': kwargs.get("dict_slug"),
+                    'word_id': pair[0],
+                    'translation': pair[2],
+                    'original': pair[1],
                 }
             )
 
             return render(request, 'words/study_words.html', context=context)
 
-        request.session['current_word_index'] = 0
-        request.session['words'] = None
+        self.get_repeat_state(request).clear()
         return redirect('words:congratulations')
 
     def post(self, request, *args, **kwargs):
@@ -274,19 +555,46 @@ class RepeatWordsView(SuccessMessageMixin, DetailView):
             context = self.get_context(
                 **{
                     'request': request,
-                    'dict_slug': kwargs["dict_slug"],
-                    'translation': pair[1],
-                    'original': pair[0],
+                    'dict_slug': kwargs.get("dict_slug"),
+                    'word_id': pair[0],
+                    'translation': pair[2],
+                    'original': pair[1],
                     'user_answer': user_answer,
                 }
             )
             return render(request, 'words/user_answer.html', context=context)
 
-        request.session['current_word_index'] = 0
-        request.session['words'] = None
+        self.get_repeat_state(request).clear()
         return redirect('words:congratulations')
 
 
+class ReviewMistakesView(RepeatWordsView):
+    """
+    Повторение слов из всех словарей пользователя, в которых он ошибался чаще всего.
+
+    Список из mistakes_limit id выбирается одним запросом по индексу WordStatistics
+    и фиксируется в RepeatStateService до конца повторения.
+    """
+    session_key = 'review_mistakes'
+    mistakes_limit = 20
+
+    def get_title(self, **kwargs):
+        return 'Review Mistakes'
+
+    def get_repeat_session(self, request, **kwargs):
+        repeat = self.get_repeat_state(request).get()
+        if not repeat:
+            most_missed = WordStatisticsService(request.user).get_most_missed(self.mistakes_limit)
+            word_ids = [pair_word_id for pair_word_id, *_ in most_missed]
+            repeat = {'word_ids': word_ids, 'position': 0, 'count': len(word_ids)}
+            self.get_repeat_state(request).set(repeat)
+
+        return repeat
+
+    def make_word_id_getter(self, repeat):
+        return lambda position: repeat['word_ids'][position]
+
+
 class StudyWordsView(DetailView):
     model = Dictionary
     template_name = 'words/study_words.html'
@@ -298,6 +606,20 @@ class StudyWordsView(DetailView):
         self.study_service = None
         self.custom_messages = {}
 
+    def dispatch(self, request, *args, **kwargs):
+        # все изменения UserLearningData записываются одним UPDATE в конце запроса
+        try:
+            with transaction.atomic():
+                response = super().dispatch(request, *args, **kwargs)
+                if self.game_session:
+                    self.game_session.commit()
+        except LearningDataConflictError:
+            self.study_service.state.clear()
+            messages.error(request, 'Your progress was changed in another tab, the study has been reloaded.')
+            return redirect(reverse('words:study_words', kwargs={'dict_slug': kwargs['dict_slug']}))
+
+        return response
+
     def get(self, request, *args, **kwargs):
         self.get_study_data(request, *args, **kwargs)
 
@@ -324,9 +646,11 @@ class StudyWordsView(DetailView):
     def get_study_data(self, request, *args, **kwargs):
         self.game_session = SessionService(request, kwargs['dict_slug'])
         self.study_service = StudyWordsService(request, self.game_session)
-        self.custom_messages = CustomMessagesService(
-            request, self.game_session.active_session.current_word_index, self.study_service.study_words
-        ).custom_messages
+        if self.study_service.study_words:
+            self.custom_messages = CustomMessagesService(
+                request, self.game_session.active_session.current_word_index, self.study_service.study_words,
+                self.study_service.scheduler, self.study_service.state
+            ).custom_messages
 
     def get_study_words_url(self):
         return str(reverse_lazy('words:study_words', kwargs={'dict_slug': self.kwargs["dict_slug"]}))
@@ -335,23 +659,59 @@ class StudyWordsView(DetailView):
 
         title = ' '.join(dictionary_slug.split('-')).title()
         context = {
-            'title': f'Study: {title} | level: {self.game_session.active_session.level}',
+            'title': f'Study: {title} | box: {self.custom_messages["box"]}',
             'form': RepeatWordForm(),
             'dict_slug': self.kwargs['dict_slug'],
             'user_answer_url': self.get_study_words_url(),
+            'answer_url': reverse('words:check_answer', kwargs={'dict_slug': dictionary_slug}),
             'custom_messages': self.custom_messages,
         }
         return context
 
 
+async def check_answer(request, dict_slug):
+    """
+    Проверяет ответ в режиме обучения и возвращает результат и следующее слово в JSON.
+
+    Асинхронная замена POST в StudyWordsView для страницы обучения: шаблон не рендерится,
+    а сервисы обучения не собираются заново, поэтому под ASGI воркер не занят на время запросов к базе.
+    Ответ 409 означает, что состояние обучения изменилось, и страницу нужно перезагрузить.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'authentication required'}, status=401)
+
+    learning_data = await (
+        UserLearningData.objects.select_related('user', 'dictionary')
+        .filter(user=user, dictionary__slug=dict_slug)
+        .afirst()
+    )
+    if learning_data is None:
+        return JsonResponse({'error': 'study session is not started'}, status=409)
+
+    state = StudyStateService(user.pk, learning_data.dictionary_id)
+    study_words = await state.aload(learning_data.next_level_point)
+    if not study_words:
+        return JsonResponse({'error': 'study session is not started'}, status=409)
+
+    answer_check = AnswerCheckService(learning_data, study_words, state)
+    try:
+        result = await answer_check.check(request.POST.get('user_answer', ''))
+    except LearningDataConflictError:
+        await state.aclear()
+        return JsonResponse({'error': 'learning data was changed by another request'}, status=409)
+
+    return JsonResponse(result)
+
+
 def show_error_words(request):
-    context = {'title': 'Error Words', 'error_words': request.session.get('error_words')}
+    most_missed = WordStatisticsService(request.user).get_most_missed(ERROR_WORDS_LIMIT)
+    context = {'title': 'Error Words', 'error_words': most_missed}
     return render(request, 'words/error_words.html', context)
 
 
 def reset(request):
-    request.session['current_word_index'] = None
-    request.session['original'] = None
-    request.session['translation'] = None
-
     return render(request, 'words/finished.html', {'title': 'Congratulations'})